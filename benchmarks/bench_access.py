@@ -0,0 +1,64 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure dotted attribute access and lookup on configuration trees of
+increasing depth, with and without the dotted path index, and the cost of
+tracing reads.
+"""
+
+from common import bench, generateSection, report
+
+from yconf.util import NestedDict, trace, untrace
+
+
+def main():
+    reads = 10000
+    for depth in (1, 3, 6):
+        nd = NestedDict(generateSection(3, depth))
+        path = ["key-0"] * depth + ["key-2"]
+        dotted = ".".join(path)
+        print("depth %d: %s" % (depth, dotted))
+
+        chained = bench(lambda: [getattr(nd, dotted) for _ in range(reads)])
+        report("  getattr, no index", chained)
+        lookup = bench(lambda: [nd.lookup(path) for _ in range(reads)])
+        report("  lookup, no index", lookup)
+
+        paths = [["key-0"] * depth + ["key-%d" % (i % 3)] for i in range(reads)]
+        report("  lookupMany, no index", bench(lambda: nd.lookupMany(paths)), lookup)
+
+        nd.buildIndex()
+        indexed = bench(lambda: [getattr(nd, dotted) for _ in range(reads)])
+        report("  getattr, indexed", indexed, chained)
+        report("  lookup, indexed", bench(lambda: [nd.lookup(path) for _ in range(reads)]), lookup)
+
+        trace(nd)
+        report("  getattr, indexed, traced", bench(lambda: [getattr(nd, dotted) for _ in range(reads)]), indexed)
+        untrace(nd)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure BaseConfiguration construction with and without the class level
+parser cache.
+"""
+
+from common import bench, report
+
+from yconf.config import BaseConfiguration
+
+
+class CachedConfiguration(BaseConfiguration):
+
+    def makeParser(self):
+        parser = super(CachedConfiguration, self).makeParser()
+        for i in range(20):
+            parser.add_argument("--option-%d" % i, dest="options.o%d" % i)
+        return parser
+
+
+class UncachedConfiguration(CachedConfiguration):
+
+    cacheParser = False
+
+
+def main():
+    instances = 1000
+    uncached = bench(lambda: [UncachedConfiguration() for _ in range(instances)], repeat=3)
+    report("%d instances, parser per instance" % instances, uncached)
+    cached = bench(lambda: [CachedConfiguration() for _ in range(instances)], repeat=3)
+    report("%d instances, cached parser" % instances, cached, uncached)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure diff between two configurations with hundreds of thousands of leaves
+that differ in a single value, against flattening both trees into dicts of
+dotted paths and comparing those.
+"""
+
+import timeit
+
+from common import bench, generateSection, report
+
+from yconf.util import NestedDict, _children, _toDict, diff
+
+
+def flatten(node, prefix="", result=None):
+    result = {} if result is None else result
+    for key, value in node.items():
+        if _children(value) is not None:
+            flatten(value, "%s%s." % (prefix, key), result)
+        else:
+            result["%s%s" % (prefix, key)] = value
+    return result
+
+
+def flatDiff(a, b):
+    a, b = flatten(a), flatten(b)
+    return [path for path in set(a) | set(b) if a.get(path) != b.get(path)]
+
+
+def main():
+    data = generateSection(8, 5)
+    a = NestedDict(data)
+    b = NestedDict(data)
+    b.update({"key-3": {"key-1": {"key-4": {"key-0": {"key-7": {"key-2": "changed"}}}}}})
+    print("%d leaves" % len(flatten(a)))
+
+    flat = bench(lambda: flatDiff(a, b), repeat=3)
+    report("  flatten and compare", flat)
+    cold = []
+    for _ in range(3):
+        # fresh trees, so that no content hash is cached yet
+        x, y = NestedDict(data), NestedDict(_toDict(b))
+        start = timeit.default_timer()
+        diff(x, y)
+        cold.append(timeit.default_timer() - start)
+    report("  diff, cold", min(cold), flat)
+    diff(a, b)
+    report("  diff, cached hashes", bench(lambda: diff(a, b)), flat)
+
+
+if __name__ == "__main__":
+    main()
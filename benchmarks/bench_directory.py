@@ -0,0 +1,70 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure directory mode loading when large environment files do not apply.
+
+production.yml is small while staging.yml and development.yml are large,
+loading the production environment should not pay for the unused files.
+"""
+
+import os
+import shutil
+import tempfile
+
+import yaml
+
+from common import bench, generateSection, report
+
+from yconf.config import BaseConfiguration
+
+
+def load(path, environment, merge=True):
+    config = BaseConfiguration(merge=merge)
+    config.parse(["-c", path, "-e", environment])
+    return config
+
+
+def main():
+    path = tempfile.mkdtemp()
+    try:
+        sections = {"production": generateSection(5, 1),
+                    "staging": generateSection(12, 2),
+                    "development": generateSection(12, 2)}
+        for e, section in sections.items():
+            with open(os.path.join(path, "%s.yml" % e), "w") as f:
+                f.write(yaml.dump(section))
+
+        everything = bench(lambda: load(path, "development"))
+        report("development, merged (all files)", everything)
+        report("production, merged", bench(lambda: load(path, "production")), everything)
+        report("staging, merged", bench(lambda: load(path, "staging")), everything)
+        report("development, not merged", bench(lambda: load(path, "development", False)), everything)
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
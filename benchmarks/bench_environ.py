@@ -0,0 +1,60 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure applying a few hundred environment variable overrides to a loaded
+configuration with a single merge, against one update per variable.
+"""
+
+from common import bench, generateSection, report
+
+from yconf.config import BaseConfiguration
+
+
+class EnvConfiguration(BaseConfiguration):
+    envPrefix = "APP_"
+
+
+def main():
+    environ = dict(("APP_KEY_%d__KEY_%d__KEY_%d" % (i % 8, j, i), str(i * j))
+                   for i in range(64) for j in range(8))
+    environ.update(("OTHER_%d" % i, "x") for i in range(500))
+    print("%d variables, %d with the prefix" % (len(environ), sum(1 for k in environ if k.startswith("APP_"))))
+
+    config = EnvConfiguration()
+    config.update(generateSection(8, 3))
+
+    def perVariable():
+        for name, value in environ.items():
+            if name.startswith("APP_"):
+                config.update(config.environOverrides(config, {name: value}))
+
+    each = bench(perVariable)
+    report("  update per variable", each)
+    report("  single merge", bench(lambda: config.update(config.environOverrides(config, environ))), each)
+
+
+if __name__ == "__main__":
+    main()
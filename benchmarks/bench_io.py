@@ -0,0 +1,89 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compare the peak resident memory of loading the production section of a large
+configuration file read into memory as text, as bytes and parsed in chunks
+while it is read. Every variant runs in a fresh process, e.g.
+`python benchmarks/bench_io.py 100` for a 100 MiB file.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import yaml
+
+from common import generateSection
+
+CHILD = """
+import resource, sys
+sys.path.insert(0, %(root)r)
+from yconf.config import _IncludeContext, _loadSections
+before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+if %(mode)r == "text":
+    with open(%(path)r) as f:
+        data = _loadSections(f.read(), ["production"])
+else:
+    data = _IncludeContext(%(dir)r, %(threshold)d).load(%(path)r, ["production"])
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)
+"""
+
+
+def peak(path, mode, threshold=0):
+    code = CHILD % dict(root=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                        path=path, dir=os.path.dirname(path), mode=mode, threshold=threshold)
+    # ru_maxrss is in KiB on Linux
+    return int(subprocess.check_output([sys.executable, "-c", code])) / 1024.0
+
+
+def main():
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    path = tempfile.mkdtemp()
+    try:
+        config = os.path.join(path, "config.yml")
+        # production is small, the other environments make up the bulk of the file
+        section = yaml.dump(generateSection(8, 3))
+        with open(config, "w") as f:
+            f.write("production:\n  a: 1\n")
+            i = 0
+            while f.tell() < megabytes * 1024 * 1024:
+                f.write("host-%d:\n" % i)
+                f.write("".join("  %s\n" % line for line in section.splitlines()))
+                i += 1
+        print("%d MiB file" % (os.path.getsize(config) // (1024 * 1024)))
+
+        text = peak(config, "text")
+        print("%-40s %10.1f MiB" % ("  read as text, production", text))
+        for name, threshold in (("  read as bytes, production", sys.maxsize), ("  streamed, production", 0)):
+            print("%-40s %10.1f MiB" % (name, peak(config, "bytes", threshold)))
+    finally:
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compare building a NestedDict from a large loaded configuration eagerly and
+lazily, in time and in memory kept alive, when only a few sections are read.
+"""
+
+import tracemalloc
+
+from common import bench, generateSection, report
+
+from yconf.util import NestedDict
+
+
+def readFew(nd):
+    return [nd["key-0"]["key-1"]["key-2"], nd.lookup(("key-3", "key-0"))]
+
+
+def allocated(data, lazy):
+    tracemalloc.start()
+    try:
+        nd = NestedDict(data, lazy=lazy)
+        readFew(nd)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return size
+
+
+def main():
+    data = generateSection(8, 4)
+
+    eager = bench(lambda: readFew(NestedDict(data)))
+    report("construct + read, eager", eager)
+    report("construct + read, lazy", bench(lambda: readFew(NestedDict(data, lazy=True))), eager)
+
+    eagerSize, lazySize = allocated(data, False), allocated(data, True)
+    print("%-40s %10.1f KiB" % ("allocated, eager", eagerSize / 1024.0))
+    print("%-40s %10.1f KiB   (%.2fx)" % ("allocated, lazy", lazySize / 1024.0, eagerSize / float(lazySize)))
+
+
+if __name__ == "__main__":
+    main()
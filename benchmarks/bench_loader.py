@@ -0,0 +1,51 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compare the pure Python loader with the libyaml backed loader on large configs.
+"""
+
+import yaml
+
+from common import bench, generateConfig, report
+
+from yconf.config import _PyLoader, _CLoader
+
+
+def main():
+    for width, depth in ((10, 2), (20, 2), (8, 3)):
+        document = yaml.dump(generateConfig(width, depth))
+        print("config: width=%d depth=%d (%d KiB)" % (width, depth, len(document) // 1024))
+
+        python = bench(lambda: yaml.load(document, Loader=_PyLoader), repeat=3)
+        report("  _PyLoader", python)
+        if _CLoader is None:
+            print("  _CLoader unavailable, PyYAML was built without libyaml")
+        else:
+            report("  _CLoader", bench(lambda: yaml.load(document, Loader=_CLoader), repeat=3), python)
+
+
+if __name__ == "__main__":
+    main()
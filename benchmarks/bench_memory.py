@@ -0,0 +1,85 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Report the memory used per NestedDict node with tracemalloc, comparing the
+__slots__ based NestedDict and interned keys with a NestedDict that carries
+an instance __dict__ and keeps every key string.
+"""
+
+import tracemalloc
+
+import yaml
+
+from common import generateSection
+
+import yconf.util
+from yconf.config import _Loader
+from yconf.util import NestedDict
+
+
+class UnslottedNestedDict(NestedDict):
+    pass
+
+
+def countNodes(nd):
+    return 1 + sum(countNodes(v) for v in nd.values() if isinstance(v, NestedDict))
+
+
+def measure(document):
+    tracemalloc.start()
+    try:
+        data = yaml.load(document, Loader=_Loader)
+        nd = yconf.util.NestedDict(data)
+        # only the tree is kept alive, as in BaseConfiguration
+        del data
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    return size, countNodes(nd)
+
+
+def main():
+    document = yaml.dump(generateSection(8, 4))
+
+    size, nodes = measure(document)
+    print("%d nodes" % nodes)
+    print("%-40s %10.1f bytes/node" % ("  __slots__, interned keys", size / float(nodes)))
+
+    # swap in the unslotted class and disable interning for the comparison
+    intern = yconf.util.intern
+    yconf.util.NestedDict = UnslottedNestedDict
+    yconf.util.intern = lambda key: key
+    try:
+        legacy, nodes = measure(document)
+    finally:
+        yconf.util.NestedDict = NestedDict
+        yconf.util.intern = intern
+    print("%-40s %10.1f bytes/node" % ("  __dict__, plain keys", legacy / float(nodes)))
+    print("%-40s %10.2fx" % ("  reduction", legacy / float(size)))
+
+
+if __name__ == "__main__":
+    main()
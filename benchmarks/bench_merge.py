@@ -0,0 +1,70 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Merge environment layers into a NestedDict, comparing NestedDict.update with
+the previous implementation that copied the existing child on every collision.
+"""
+
+from common import bench, generateSection, report
+
+from yconf.util import NestedDict
+
+
+def legacyUpdate(self, other):
+    for (key, value) in other.items():
+        value = NestedDict(value) if type(value) is dict else value
+
+        if '.' in key:
+            key, remainder = key.split('.', 1)
+            value = NestedDict({remainder: value})
+        if key in self.data and \
+            type(self[key]) in (dict, NestedDict) and \
+                type(value) in (dict, NestedDict):
+            self.data[key] = NestedDict(self[key])
+            object.__setattr__(self.data[key], "parent", self)
+            legacyUpdate(self.data[key], value)
+        else:
+            self.data[key] = value
+
+
+def mergeLayers(update, layers):
+    nd = NestedDict()
+    for layer in layers:
+        update(nd, layer)
+    return nd
+
+
+def main():
+    for width, depth in ((2, 10), (4, 6), (30, 2), (300, 1)):
+        layers = [generateSection(width, depth) for _ in range(3)]
+        print("tree: width=%d depth=%d, 3 layers" % (width, depth))
+        legacy = bench(lambda: mergeLayers(legacyUpdate, layers), repeat=3)
+        report("  copying update", legacy)
+        report("  NestedDict.update", bench(lambda: mergeLayers(NestedDict.update, layers), repeat=3), legacy)
+
+
+if __name__ == "__main__":
+    main()
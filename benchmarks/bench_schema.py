@@ -0,0 +1,53 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure validating a configuration against a schema of a few hundred
+fields, compiling the schema every time against reusing the compiled form.
+"""
+
+from common import bench, generateSection, report
+
+from yconf.schema import Field, Schema
+from yconf.util import NestedDict
+
+
+def main():
+    nd = NestedDict(generateSection(8, 3))
+    fields = {}
+    for i in range(8):
+        for j in range(8):
+            for k in range(8):
+                fields["key-%d.key-%d.key-%d.key-%d" % (i, j, k, i)] = Field(str, required=True)
+    print("%d fields" % len(fields))
+
+    compiled = Schema(fields)
+    each = bench(lambda: Schema(fields).validate(nd))
+    report("  compile and validate", each)
+    report("  validate, compiled once", bench(lambda: compiled.validate(nd)), each)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compare the memory each forked worker copies when reading every value of a
+configuration inherited as a NestedDict tree with reading it from a
+published shared memory segment. Linux only, reads /proc/self/smaps_rollup.
+"""
+
+import os
+
+from common import generateSection
+
+from yconf.shared import SharedConfig, publish
+from yconf.util import NestedDict
+
+
+def privateDirty():
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith("Private_Dirty:"):
+                return int(line.split()[1])
+
+
+def walk(node):
+    count = 0
+    for key, value in node.items():
+        if hasattr(value, "items"):
+            count += walk(value)
+        else:
+            count += 1
+    return count
+
+
+def workers(config, count):
+    """
+    Fork count workers reading all of config and return the KiB each of them
+    copied on average.
+    """
+    pipes = []
+    for _ in range(count):
+        r, w = os.pipe()
+        if os.fork() == 0:
+            os.close(r)
+            before = privateDirty()
+            walk(config)
+            os.write(w, str(privateDirty() - before).encode())
+            os._exit(0)
+        os.close(w)
+        pipes.append(r)
+
+    total = 0
+    for r in pipes:
+        total += int(os.read(r, 64))
+        os.close(r)
+        os.wait()
+    return total / float(count)
+
+
+def main():
+    count = 4
+    nd = NestedDict(generateSection(8, 4))
+    print("%-40s %10.1f KiB/worker" % ("  NestedDict", workers(nd, count)))
+
+    segment = publish(nd)
+    try:
+        del nd
+        shared = SharedConfig(segment.buf)
+        print("%-40s %10.1f KiB/worker" % ("  SharedConfig (%d KiB segment)" % (segment.size // 1024),
+                                           workers(shared, count)))
+        del shared
+    finally:
+        segment.close()
+        segment.unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Compare loading a whole single file configuration with loading only the
+sections of the active environment. BaseConfiguration loads the whole
+document when every section is needed.
+"""
+
+import tracemalloc
+
+import yaml
+
+from common import bench, generateSection, report
+
+from yconf.config import _Loader, _loadSections
+
+
+def peak(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    document = yaml.dump({"production": generateSection(5, 1),
+                          "staging": generateSection(10, 2),
+                          "development": generateSection(12, 2)})
+    print("config: %d KiB" % (len(document) // 1024))
+
+    cases = (("full document", lambda: yaml.load(document, Loader=_Loader)),
+             ("production", lambda: _loadSections(document, ["production"])),
+             ("production, staging", lambda: _loadSections(document, ["production", "staging"])),
+             ("all sections", lambda: _loadSections(document, ["production", "staging", "development"])))
+
+    baseline = None
+    for name, func in cases:
+        seconds = bench(func, repeat=3)
+        report("  %s" % name, seconds, baseline)
+        print("  %-38s %10d KiB peak" % ("", peak(func) // 1024))
+        baseline = baseline or seconds
+
+
+if __name__ == "__main__":
+    main()
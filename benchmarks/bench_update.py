@@ -0,0 +1,57 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Micro benchmarks for NestedDict.update on configurations with 100k keys,
+flat and nested, built from scratch and merged over an existing tree.
+"""
+
+from common import bench, report
+
+from yconf.util import NestedDict
+
+
+def flat(count, value="value"):
+    return dict(("key-%d" % i, value) for i in range(count))
+
+
+def nested(count, value="value", width=10):
+    # width ** depth leaves, at least count of them
+    if count <= width:
+        return flat(count, value)
+    return dict(("key-%d" % i, nested(count // width, value, width)) for i in range(width))
+
+
+def main():
+    for name, make in (("flat", flat), ("nested", nested)):
+        base, override = make(100000), make(100000, "override")
+        print("%s, 100k keys" % name)
+        report("  build", bench(lambda: NestedDict(base), repeat=3))
+        tree = NestedDict(base)
+        report("  merge over existing tree", bench(lambda: tree.update(override), repeat=3))
+
+
+if __name__ == "__main__":
+    main()
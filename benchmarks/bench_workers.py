@@ -0,0 +1,69 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Measure directory mode loading with the environment files parsed in a
+process pool, for an increasing number of files and file sizes.
+"""
+
+import os
+import shutil
+import tempfile
+
+import yaml
+
+from common import bench, generateSection, report
+
+from yconf.config import BaseConfiguration
+
+
+def load(path, environment, workers):
+    config = BaseConfiguration(workers=workers)
+    config.parse(["-c", path, "-e", environment])
+    return config
+
+
+def main():
+    environments = ("production", "staging", "development")
+    for width in (8, 30):
+        path = tempfile.mkdtemp()
+        try:
+            for e in environments:
+                with open(os.path.join(path, "%s.yml" % e), "w") as f:
+                    f.write(yaml.dump(generateSection(width, 2)))
+            size = os.path.getsize(os.path.join(path, "production.yml"))
+
+            for count, environment in enumerate(environments, 1):
+                print("%d file(s) of %d KiB" % (count, size // 1024))
+                serial = bench(lambda: load(path, environment, None), repeat=3)
+                report("  serial", serial)
+                for workers in range(2, count + 1):
+                    report("  %d workers" % workers, bench(lambda: load(path, environment, workers), repeat=3), serial)
+        finally:
+            shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Helpers shared by the benchmark scripts in this directory.
+
+The benchmarks are plain scripts and are not part of the test suite,
+run them directly, e.g. `python benchmarks/bench_loader.py`.
+"""
+
+import os
+import sys
+import timeit
+
+# make the benchmarks runnable from a source checkout
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def generateSection(width, depth, prefix="key"):
+    """
+    Generate a nested mapping with `width` keys per level and `depth` levels.
+    """
+    if depth <= 0:
+        return dict(("%s-%d" % (prefix, i), "value %d" % i) for i in range(width))
+    section = {}
+    for i in range(width):
+        section["%s-%d" % (prefix, i)] = generateSection(width, depth - 1, prefix)
+    section["list"] = list(range(width))
+    section["flag"] = True
+    return section
+
+
+def generateConfig(width, depth, environments=("production", "staging", "development")):
+    """
+    Generate a multi environment configuration as accepted by BaseConfiguration.
+    """
+    return dict((e, generateSection(width, depth)) for e in environments)
+
+
+def bench(func, repeat=5, number=1):
+    """
+    Return the best wall clock time of `repeat` runs of `number` calls to `func`.
+    """
+    return min(timeit.repeat(func, repeat=repeat, number=number)) / number
+
+
+def report(name, seconds, baseline=None):
+    line = "%-40s %10.2f ms" % (name, seconds * 1000)
+    if baseline:
+        line += "   (%.2fx)" % (baseline / seconds)
+    print(line)
@@ -0,0 +1,210 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Benchmark suite for the parse, merge and access hot paths.
+
+Every `time_*` function below is a benchmark, parametrised over the values in
+its `params` attribute. The result is the best time of several runs.
+
+    python benchmarks/suite.py                       # print results
+    python benchmarks/suite.py -o results.json       # also write them as json
+    python benchmarks/suite.py -c before.json        # compare with earlier results
+    python benchmarks/suite.py -k access             # only run matching benchmarks
+
+The json files contain the python version, the git revision and the timings
+in seconds per benchmark, so results can be compared across commits.
+"""
+
+import os
+import sys
+import json
+import atexit
+import shutil
+import argparse
+import platform
+import tempfile
+import subprocess
+
+import yaml
+
+from common import bench, generateConfig, generateSection
+
+from yconf.config import BaseConfiguration, _Loader
+from yconf.util import NestedDict
+
+
+def params(*values):
+    def decorator(func):
+        func.params = values
+        return func
+    return decorator
+
+
+# yaml documents by size, generated once
+_documents = {}
+
+
+def _document(width):
+    if width not in _documents:
+        _documents[width] = yaml.dump(generateConfig(width, 2))
+    return _documents[width]
+
+
+@params(4, 8, 16)
+def time_load(width):
+    document = _document(width)
+    return lambda: yaml.load(document, Loader=_Loader)
+
+
+@params(4, 8, 16)
+def time_merge_layers(width):
+    layers = [generateSection(width, 2) for _ in range(3)]
+
+    def run():
+        nd = NestedDict()
+        for layer in layers:
+            nd.update(layer)
+    return run
+
+
+@params(4, 8, 16)
+def time_merge_layers_lazy(width):
+    layers = [generateSection(width, 2) for _ in range(3)]
+
+    def run():
+        nd = NestedDict(lazy=True)
+        for layer in layers:
+            nd.update(layer)
+    return run
+
+
+@params(1, 4, 8)
+def time_attribute_access(depth):
+    nd = NestedDict(generateSection(2, depth))
+    names = ["key-1"] * depth + ["key-0"]
+
+    def run():
+        for _ in range(1000):
+            value = nd
+            for name in names:
+                value = getattr(value, name)
+    return run
+
+
+@params(1, 4, 8)
+def time_dotted_access(depth):
+    nd = NestedDict(generateSection(2, depth))
+    path = ".".join(["key-1"] * depth + ["key-0"])
+
+    def run():
+        for _ in range(1000):
+            getattr(nd, path)
+    return run
+
+
+class _Configuration(BaseConfiguration):
+
+    def makeParser(self):
+        parser = super(_Configuration, self).makeParser()
+        parser.add_argument("--level", dest="key_1.key_0.key_0")
+        parser.add_argument("--name", dest="name", default="example")
+        return parser
+
+
+# scratch directory for configuration files, removed on exit
+_tmp = []
+
+
+def _configFile(width):
+    if not _tmp:
+        _tmp.append(tempfile.mkdtemp())
+        atexit.register(shutil.rmtree, _tmp[0], True)
+    path = os.path.join(_tmp[0], "config-%d.yml" % width)
+    with open(path, "w") as f:
+        f.write(_document(width))
+    return path
+
+
+@params(4, 8, 16)
+def time_parse(width):
+    path = _configFile(width)
+
+    def run():
+        config = _Configuration()
+        config.parse(["-c", path, "-e", "development", "--level", "debug"])
+    return run
+
+
+def benchmarks(pattern=None):
+    for name, func in sorted(globals().items()):
+        if name.startswith("time_") and callable(func):
+            for param in getattr(func, "params", (None,)):
+                full = "%s(%s)" % (name[5:], param) if param is not None else name[5:]
+                if pattern is None or pattern in full:
+                    yield full, func, param
+
+
+def revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.STDOUT,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the yconf benchmark suite.")
+    parser.add_argument("-o", "--output", help="Write the results as json to this file.")
+    parser.add_argument("-c", "--compare", help="Compare with results from an earlier run.")
+    parser.add_argument("-k", dest="pattern", help="Only run benchmarks whose name contains this.")
+    parser.add_argument("-r", "--repeat", type=int, default=5, help="Number of runs per benchmark.")
+    args = parser.parse_args(argv)
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for name, func, param in benchmarks(args.pattern):
+        run = func(param) if param is not None else func()
+        results[name] = bench(run, repeat=args.repeat)
+
+        line = "%-32s %10.3f ms" % (name, results[name] * 1000)
+        if name in baseline:
+            line += "   %+6.1f%%" % ((results[name] / baseline[name] - 1) * 100)
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"python": platform.python_version(),
+                       "implementation": platform.python_implementation(),
+                       "revision": revision(),
+                       "results": results}, f, indent=2, sort_keys=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+asyncio variants of BaseConfiguration.parse and BaseConfiguration.loadConfig.
+
+Configuration files are read and parsed concurrently in an executor, so the
+event loop is not blocked while loading. The result is the same as with the
+synchronous methods.
+"""
+
+import asyncio
+
+from yconf.instrument import measure
+
+
+async def loadConfig(config, executor=None):
+    loop = asyncio.get_event_loop()
+    if config._cacheDir:
+        # a warm cache does not parse anything, no need to split up the work
+        await loop.run_in_executor(executor, config.loadConfig)
+        return
+
+    with measure(config._parseReport, "loadConfig"):
+        files = await loop.run_in_executor(executor, config.configFiles)
+        # one context for all files, so fragments included from several files are parsed once
+        context = config._includeContext()
+        layers = await asyncio.gather(*[loop.run_in_executor(executor, config.loadFile, path, context)
+                                        for path in files])
+        d = {}
+        for layer in layers:
+            d.update(layer)
+        config.mergeLayers(config, d)
+
+
+async def parse(config, args, executor=None):
+    config._startReport()
+    with measure(config._parseReport, "parse"):
+        config._parseConfigArgs(args)
+        if config.configPath:
+            await loadConfig(config, executor)
+        config._parseArgs()
+
+
+__all__ = ["loadConfig", "parse"]
@@ -0,0 +1,121 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import hashlib
+import tempfile
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+
+# os.rename does not overwrite existing files on Windows
+_replace = getattr(os, "replace", os.rename)
+
+# bump whenever the layout of cache entries changes
+_VERSION = 1
+
+
+class ConfigCache(object):
+    """
+    On-disk cache for loaded configurations.
+
+    Entries are pickled plain dicts stored under a key derived from the
+    configuration files, the environment and the merge mode. Each entry
+    records the mtime, size and content hash of the files it was built
+    from and is discarded as soon as any of them changes.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def key(self, files, *args):
+        h = hashlib.sha1(repr((_VERSION, tuple(files)) + args).encode("utf-8"))
+        return h.hexdigest()
+
+    def fingerprint(self, files):
+        """
+        Return a list of (path, mtime, size, sha1) tuples for the given files or directories.
+        """
+        result = []
+        for path in files:
+            st = os.stat(path)
+            if os.path.isdir(path):
+                # directories are fingerprinted by their listing
+                digest = hashlib.sha1(repr(sorted(os.listdir(path))).encode("utf-8")).hexdigest()
+            else:
+                with open(path, "rb") as f:
+                    digest = hashlib.sha1(f.read()).hexdigest()
+            result.append((path, st.st_mtime, st.st_size, digest))
+        return result
+
+    def isValid(self, fingerprint):
+        for path, mtime, size, digest in fingerprint:
+            try:
+                st = os.stat(path)
+            except OSError:
+                return False
+            if st.st_mtime != mtime or st.st_size != size:
+                return False
+        # stat can miss edits within the timestamp resolution, compare content too
+        try:
+            return self.fingerprint([f[0] for f in fingerprint]) == fingerprint
+        except (IOError, OSError):
+            return False
+
+    def get(self, key):
+        """
+        Return the cached data for key or None if there is no valid entry.
+        """
+        try:
+            with open(os.path.join(self.path, key), "rb") as f:
+                fingerprint, data = pickle.load(f)
+        except Exception:
+            # missing, truncated or otherwise unreadable entries are a cache miss
+            return None
+        if not self.isValid(fingerprint):
+            return None
+        return data
+
+    def set(self, key, fingerprint, data):
+        """
+        Store data for key. The fingerprint should be taken before the files were
+        read, so that edits racing with the load invalidate the entry.
+        """
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+        fd, tmp = tempfile.mkstemp(dir=self.path, prefix=".%s." % key)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((fingerprint, data), f, pickle.HIGHEST_PROTOCOL)
+            _replace(tmp, os.path.join(self.path, key))
+        except Exception:
+            os.unlink(tmp)
+            raise
+
+
+__all__ = ["ConfigCache"]
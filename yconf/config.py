@@ -24,28 +24,312 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 import os
+import glob
 import yaml
+import weakref
 import argparse
+import threading
 
-from yconf.util import NestedDict
+from yaml.composer import Composer, ComposerError
+from yaml.constructor import ConstructorError, SafeConstructor
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
 
+from yconf.cache import ConfigCache
+from yconf.environment import EnvironmentGraph
+from yconf.instrument import ParseReport, countNodes, measure
+from yconf.schema import Schema
+from yconf.util import NestedDict, _children, _setTrace, _toDict, diff, trace
 
-class _Loader(yaml.SafeLoader):
 
-    def __init__(self, *args, **kwargs):
-        super(_Loader, self).__init__(*args, **kwargs)
+def _aliasKeys(mapping):
+    # hyphenated keys are available under their underscored name as well,
+    # so "log-level" can be accessed as config.log_level
+    result = dict()
+    for key, value in mapping.items():
+        result[key] = value
+        if type(key) == str and "-" in key:
+            new = key.replace("-", "_")
+            if new in mapping:
+                raise Exception("Key '%s' causes a mapping conflict with key '%s'." % (new, key))
+            result[new] = value
+    return result
+
+
+class _LoaderMixin(object):
+    """
+    Adds underscored aliases for hyphenated keys and the !include and !include_dir
+    tags to a yaml loader.
+    """
+
+    # the _IncludeContext resolving includes, set by _load and _loadSections
+    context = None
 
     def construct_mapping(self, node, deep=False):
-        result = dict()
-        mapping = super(_Loader, self).construct_mapping(node, deep)
-        for key, value in mapping.items():
-            result[key] = value
-            if type(key) == str and "-" in key:
-                new = key.replace("-", "_")
-                if new in mapping:
-                    raise Exception("Key '%s' causes a mapping conflict with key '%s'." % (new, key))
-                result[new] = value
+        return _aliasKeys(super(_LoaderMixin, self).construct_mapping(node, deep))
+
+
+class _PyLoader(_LoaderMixin, yaml.SafeLoader):
+    pass
+
+
+if hasattr(yaml, "CSafeLoader"):
+    class _CLoader(_LoaderMixin, yaml.CSafeLoader):
+        pass
+else:
+    # PyYAML was built without libyaml
+    _CLoader = None
+
+
+_Loader = _CLoader or _PyLoader
+
+
+if _CLoader is not None:
+    from yaml.cyaml import CParser
+
+    class _CStreamLoader(_LoaderMixin, CParser, Composer, SafeConstructor, Resolver):
+        """
+        The libyaml parser combined with the Python composer, so that nodes can be
+        composed one at a time from the C event stream.
+        """
+
+        def __init__(self, stream):
+            CParser.__init__(self, stream)
+            Composer.__init__(self)
+            SafeConstructor.__init__(self)
+            Resolver.__init__(self)
+else:
+    _CStreamLoader = None
+
+
+_StreamLoader = _CStreamLoader or _PyLoader
+
+
+# files of at least this many bytes are parsed while they are read
+_STREAM_THRESHOLD = 4 * 1024 * 1024
+
+
+class _IncludeContext(object):
+    """
+    Resolves !include and !include_dir tags for one load of a configuration.
+
+    Paths are relative to root, the directory of the configuration. Every file is
+    parsed once per context, however often it is included. A context may be shared
+    by threads loading different files, as in yconf.aio.
+    """
+
+    def __init__(self, root, streamThreshold=_STREAM_THRESHOLD):
+        self.root = root
+        self.streamThreshold = streamThreshold
+        self.cache = {}
+        # included files are parsed one at a time, so each is parsed only once
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        # files and directories read through includes
+        self.dependencies = []
+        # the ParseReport of the configuration, if it is instrumented
+        self.report = None
+
+    @property
+    def stack(self):
+        # the files being loaded by the current thread, to detect include cycles
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def load(self, path, sections=None):
+        self.stack.append(path)
+        try:
+            # the loaders decode bytes themselves, which saves a decoded copy of the file
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                with measure(self.report, "read", path=path, bytes=size):
+                    # large files are handed over as a file, which the parser reads in chunks
+                    stream = f if size >= self.streamThreshold else f.read()
+                with measure(self.report, "yaml", path=path) as timing:
+                    if sections is None:
+                        data = _load(stream, self)
+                    else:
+                        data = _loadSections(stream, sections, context=self)
+                    if self.report is not None:
+                        timing.info["nodes"] = countNodes(data)
+            return data
+        except yaml.MarkedYAMLError as e:
+            # errors in bytes are marked with "<byte string>", name the file instead;
+            # marks of included files already carry their own name
+            for attr in ("context_mark", "problem_mark"):
+                mark = getattr(e, attr)
+                if mark is not None and mark.name == "<byte string>":
+                    # the marks of the C parser are read only
+                    setattr(e, attr, yaml.Mark(path, mark.index, mark.line, mark.column,
+                                               mark.buffer, mark.pointer))
+            raise
+        finally:
+            self.stack.pop()
+
+    def include(self, path, node):
+        path = os.path.normpath(os.path.join(self.root, path))
+        if path in self.stack:
+            raise ConstructorError(None, None, "include cycle: %s" % " -> ".join(self.stack + [path]),
+                                   node.start_mark)
+        with self._lock:
+            if path not in self.cache:
+                self.dependencies.append(path)
+                self.cache[path] = self.load(path)
+            return self.cache[path]
+
+    def includeDir(self, pattern, node):
+        pattern = os.path.normpath(os.path.join(self.root, pattern))
+        if os.path.isdir(pattern):
+            pattern = os.path.join(pattern, "*.yml")
+        # the directory listing decides which files are included
+        directory = os.path.dirname(pattern)
+        with self._lock:
+            if directory not in self.dependencies:
+                self.dependencies.append(directory)
+
+        result = {}
+        for path in sorted(glob.glob(pattern)):
+            result[os.path.splitext(os.path.basename(path))[0]] = self.include(path, node)
+        return _aliasKeys(result)
+
+
+def _constructInclude(loader, node):
+    if loader.context is None:
+        raise ConstructorError(None, None, "%s is only supported in configuration files" % node.tag,
+                               node.start_mark)
+    if node.tag == "!include_dir":
+        return loader.context.includeDir(loader.construct_scalar(node), node)
+    return loader.context.include(loader.construct_scalar(node), node)
+
+
+for _cls in (_PyLoader, _CLoader, _CStreamLoader):
+    if _cls is not None:
+        _cls.add_constructor("!include", _constructInclude)
+        _cls.add_constructor("!include_dir", _constructInclude)
+
+
+def _load(stream, context=None, Loader=None):
+    loader = (Loader or _Loader)(stream)
+    loader.context = context
+    try:
+        return loader.get_single_data()
+    finally:
+        loader.dispose()
+
+
+def _skipNode(loader):
+    """
+    Consume the events of the next node without composing it. Anchored nodes are
+    composed nevertheless, since aliases further down may refer to them.
+    """
+    depth = 0
+    while True:
+        event = loader.peek_event()
+        if getattr(event, "anchor", None) is not None and not isinstance(event, yaml.AliasEvent):
+            loader.compose_node(None, None)
+        else:
+            loader.get_event()
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+        if depth == 0:
+            return
+
+
+def _loadSections(stream, names, Loader=None, context=None):
+    """
+    Load the top level sections listed in names from a single document stream.
+
+    Sections that are not requested are skipped on the event level and never
+    composed or constructed. Documents that are not a mapping are loaded as a whole.
+    """
+    loader = (Loader or _StreamLoader)(stream)
+    loader.context = context
+    try:
+        loader.get_event()
+        if loader.check_event(yaml.StreamEndEvent):
+            return None
+        document = loader.get_event()
+
+        if loader.check_event(yaml.MappingStartEvent):
+            loader.get_event()
+            result = {}
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = loader.compose_node(None, None)
+                if isinstance(key, yaml.ScalarNode) and key.value in names:
+                    result[key.value] = loader.construct_document(loader.compose_node(None, key))
+                else:
+                    _skipNode(loader)
+            loader.get_event()
+        else:
+            result = loader.construct_document(loader.compose_node(None, None))
+
+        loader.get_event()
+        if not loader.check_event(yaml.StreamEndEvent):
+            event = loader.get_event()
+            raise ComposerError("expected a single document in the stream", document.start_mark,
+                                "but found another document", event.start_mark)
         return result
+    finally:
+        loader.dispose()
+
+
+def _parseFile(path, sections=None, context=None):
+    """
+    Parse the yaml file at path, loading only the given top level sections if
+    sections is not None. Includes are resolved relative to the directory of path
+    unless an _IncludeContext is given.
+    """
+    if context is None:
+        context = _IncludeContext(os.path.dirname(path))
+    return context.load(path, sections)
+
+
+_resolver = Resolver()
+_constructor = SafeConstructor()
+
+
+def _environValue(value):
+    # environment variables hold plain yaml scalars, e.g. 8080, true or null
+    tag = _resolver.resolve(ScalarNode, value, (True, False))
+    if tag == "tag:yaml.org,2002:str":
+        return value
+    return _constructor.yaml_constructors[tag](_constructor, ScalarNode(tag, value))
+
+
+def _environNames(data, key, folded):
+    # the names data holds the setting under, compared case insensitively and with
+    # hyphens read as underscores, e.g. logLevel for loglevel or log-level for log_level
+    if data is None:
+        return [key]
+    names = folded.get(id(data))
+    if names is None:
+        names = folded[id(data)] = {}
+        for name in data:
+            if type(name) is str:
+                names.setdefault(name.lower().replace("-", "_"), []).append(name)
+    return names.get(key, [key])
+
+
+def _assignEnviron(overrides, data, keys, value, folded):
+    # settings are overridden under every name they were loaded with
+    for name in _environNames(data, keys[0], folded):
+        if len(keys) == 1:
+            overrides[name] = value
+            continue
+        child = overrides.get(name)
+        if not isinstance(child, dict):
+            child = overrides[name] = {}
+        _assignEnviron(child, _children(data.get(name)) if data is not None else None, keys[1:], value,
+                       folded)
+
+
+def _parseFileDependencies(path, sections=None, streamThreshold=_STREAM_THRESHOLD):
+    # used with process pools, where the include context cannot be shared
+    context = _IncludeContext(os.path.dirname(path), streamThreshold)
+    return context.load(path, sections), context.dependencies
 
 
 PRODUCTION  = 10
@@ -61,22 +345,83 @@ _environmentNames = {
     "development"   : DEVELOPMENT
     }
 
+# attributes of BaseConfiguration that are stored next to the settings
+_options = ("merge", "parser", "_configParser")
+
+# settings taken from the command line before the configuration files are loaded
+_arguments = ("configPath", "environment")
+
+# top level names environment variables do not override, folded like their names
+_environReserved = frozenset(name.lower() for name in _options + _arguments)
+
+
+def _defaultEnvironment(graph):
+    # production if there is one, otherwise the environment inheriting from nothing listed first
+    if "production" in graph:
+        return "production"
+    return graph.names[0]
+
 
 class BaseConfiguration(NestedDict):
 
     _environments = ("production", "staging", "development")
 
-    def __init__(self, merge=True):
+    # environment -> parent environments, e.g. {"eu": ["production"], "eu-host1": ["eu"]},
+    # by default each of _environments inherits from the one before it
+    _environmentParents = None
+
+    # class -> (environment parents, EnvironmentGraph)
+    _graphs = weakref.WeakKeyDictionary()
+
+    # environment variables starting with envPrefix override settings, envSeparator
+    # separates the keys of nested settings, e.g. APP_LOGGING__LEVEL for logging.level
+    envPrefix = None
+    envSeparator = "__"
+
+    # dotted path or nested mapping of keys -> yconf.schema.Field, checked by parse() and reload()
+    settingsSchema = None
+
+    # class -> (schema, Schema)
+    _schemas = weakref.WeakKeyDictionary()
+
+    # build the argument parsers once per class instead of once per instance,
+    # disable for subclasses whose makeParser depends on the instance
+    cacheParser = True
+
+    # configuration files of at least this many bytes are parsed in chunks
+    # while they are read instead of being read into memory first
+    streamThreshold = _STREAM_THRESHOLD
 
-        NestedDict.__init__(self, {})
+    # class -> (makeParser, config parser, parser)
+    _parsers = weakref.WeakKeyDictionary()
+
+    def __init__(self, merge=True, cacheDir=None, indexed=False, workers=None, instrument=None,
+                 traceAccess=False, lazy=False):
+
+        # lazy leaves the loaded sections as they are until they are accessed
+        NestedDict.__init__(self, {}, lazy=lazy)
+        object.__setattr__(self, "_defaults", None)
+        object.__setattr__(self, "_argv", None)
+        # ParseReport of the last parse() if instrument is set, see getParseReport
+        object.__setattr__(self, "_parseReport", None)
 
         self.merge = merge
+        # options are kept out of the settings under private names, so that settings
+        # of the same name neither change nor hide them
+        object.__setattr__(self, "_cacheDir", cacheDir)
+        object.__setattr__(self, "_indexed", indexed)
+        object.__setattr__(self, "_workers", workers)
+        # True or a callback receiving every Timing recorded during parse()
+        object.__setattr__(self, "_instrument", instrument)
+        # count reads of the configuration once it is parsed, see yconf.util.trace
+        object.__setattr__(self, "_traceAccess", traceAccess)
 
         self.configPath = None
-        self.environment = "production"
-        self.parser = self.makeParser()
+        self.environment = _defaultEnvironment(self.environmentGraph())
+        self.parser = self._getParser()
 
     def getEnvironment(self, environment):
+        # the order of the built in environments only, merging follows environmentGraph
         if isinstance(environment, int):
             return environment
         elif str(environment) == environment:
@@ -90,38 +435,295 @@ class BaseConfiguration(NestedDict):
         self._configParser = argparse.ArgumentParser(add_help=False)
         self._configParser.add_argument("-c", "--config", dest="configPath",
                                         help="Configuration file or directory containing the configuration files.")
-        self._configParser.add_argument("-e", "--environment", default="production",
-                                        choices=("production", "staging", "development"),
-                                        help="The environment used for configuration. (default: production)")
+        graph = self.environmentGraph()
+        default = _defaultEnvironment(graph)
+        self._configParser.add_argument("-e", "--environment", default=default, choices=graph.names,
+                                        help="The environment used for configuration. (default: %s)" % default)
 
         parser = argparse.ArgumentParser(parents=[self._configParser], argument_default=argparse.SUPPRESS)
         return parser
 
+    @classmethod
+    def environmentGraph(cls):
+        """
+        Return the EnvironmentGraph of this class, built once from _environmentParents.
+        """
+        parents = cls._environmentParents
+        source = parents if parents is not None else cls._environments
+        entry = BaseConfiguration._graphs.get(cls)
+        if entry is None or entry[0] is not source:
+            if parents is not None:
+                graph = EnvironmentGraph(source)
+            else:
+                graph = EnvironmentGraph.chain(tuple(source))
+            entry = BaseConfiguration._graphs[cls] = (source, graph)
+        return entry[1]
+
+    @classmethod
+    def compiledSchema(cls):
+        """
+        Return the Schema compiled from settingsSchema, compiled once per class, or None.
+        """
+        if cls.settingsSchema is None:
+            return None
+        entry = BaseConfiguration._schemas.get(cls)
+        if entry is None or entry[0] is not cls.settingsSchema:
+            entry = BaseConfiguration._schemas[cls] = (cls.settingsSchema, Schema(cls.settingsSchema))
+        return entry[1]
+
+    def validateSettings(self, config=None):
+        """
+        Check config, by default this configuration, against settingsSchema and
+        raise a yconf.schema.ValidationError listing every violation.
+        """
+        schema = self.compiledSchema()
+        if schema is not None:
+            with measure(self._parseReport, "validate"):
+                schema.validate(self if config is None else config)
+
+    def _getParser(self):
+        cls = type(self)
+        if not self.cacheParser:
+            return self.makeParser()
+
+        # rebuild when makeParser was replaced after the parser was cached
+        makeParser = getattr(cls.makeParser, "__func__", cls.makeParser)
+        entry = BaseConfiguration._parsers.get(cls)
+        if entry is None or entry[0] is not makeParser:
+            parser = self.makeParser()
+            entry = BaseConfiguration._parsers[cls] = (makeParser, self._configParser, parser)
+        else:
+            self._configParser = entry[1]
+        return entry[2]
+
+    @classmethod
+    def invalidateParser(cls):
+        """
+        Drop the cached parsers of this class and its subclasses, e.g. after
+        changing a makeParser method they inherit.
+        """
+        for c in list(BaseConfiguration._parsers.keys()):
+            if issubclass(c, cls):
+                BaseConfiguration._parsers.pop(c, None)
+
     def parse(self, args):
 
+        self._startReport()
+        with measure(self._parseReport, "parse"):
+            self._parseConfigArgs(args)
+            if self.configPath:
+                self.loadConfig()
+            self._parseArgs()
+
+    def _startReport(self):
+        if self._instrument:
+            callback = self._instrument if callable(self._instrument) else None
+            object.__setattr__(self, "_parseReport", ParseReport(callback))
+
+    def getParseReport(self):
+        """
+        Return the ParseReport of the last parse(), or None if instrument was not set.
+        """
+        return self._parseReport
+
+    def _parseConfigArgs(self, args):
         args, remaining_argv = self._configParser.parse_known_args(args=args, namespace=self)
-        if self.configPath:
-            self.loadConfig()
-        self.parser.parse_args(remaining_argv, self)
+        # keep what is needed to rebuild the configuration in reload()
+        object.__setattr__(self, "_defaults", _toDict(self.data))
+        object.__setattr__(self, "_argv", remaining_argv)
+
+    def _parseArgs(self):
+        self.loadEnviron(self)
+        # command line arguments take precedence over the configuration files
+        with measure(self._parseReport, "arguments"):
+            self.parser.parse_args(self._argv, self)
+        self.validateSettings()
+        if self._indexed:
+            self.buildIndex()
+        if self._traceAccess:
+            # the configuration file and environment are settings nobody has to read
+            trace(self, ignore=_options + _arguments)
+
+    def environOverrides(self, target=None, environ=None):
+        """
+        Return the nested mapping of settings overridden by the environment variables
+        starting with envPrefix. Values are parsed as yaml scalars. If target is given,
+        settings it holds are overridden under the names they have there, which are
+        matched case insensitively and with hyphens read as underscores. The options
+        of the configuration, such as its environment, are never overridden.
+        """
+        if not self.envPrefix:
+            return {}
+        if environ is None:
+            environ = os.environ
+
+        prefix, separator = self.envPrefix, self.envSeparator
+        data = _children(target) if target is not None else None
+        overrides = {}
+        # id of a mapping in target -> its keys by folded name
+        folded = {}
+        # sorted, so that APP_A__B consistently wins over APP_A
+        for name in sorted(name for name in environ if name.startswith(prefix)):
+            keys = name[len(prefix):].lower().split(separator)
+            if all(keys) and keys[0] not in _environReserved:
+                _assignEnviron(overrides, data, keys, _environValue(environ[name]), folded)
+        return overrides
+
+    def loadEnviron(self, target):
+        """
+        Merge the settings overridden by environment variables into target.
+        They take precedence over the configuration files but not over the
+        command line arguments.
+        """
+        if not self.envPrefix:
+            return
+        with measure(self._parseReport, "environ"):
+            overrides = self.environOverrides(target)
+            if overrides:
+                target.update(overrides)
+
+    def configFiles(self):
+        """
+        Return the absolute paths of the files the configuration is loaded from.
+        """
+        path = os.path.abspath(self.configPath)
+        if os.path.isfile(path):
+            return [path]
+        elif os.path.isdir(path):
+            files = [os.path.join(path, "%s.yml" % e) for e in self.activeEnvironments()]
+            return [f for f in files if os.path.exists(f)]
+        return []
+
+    def activeEnvironments(self):
+        """
+        Return the environments contributing to the configuration in merge order.
+        """
+        if not self.merge:
+            return [self.environment]
+        return list(self.environmentGraph().plan(self.environment))
 
     def loadConfig(self):
+        with measure(self._parseReport, "loadConfig"):
+            if self._cacheDir:
+                self._loadCachedConfig()
+            else:
+                self.mergeLayers(self, self.loadLayers())
+
+    def _loadCachedConfig(self):
+        cache = ConfigCache(self._cacheDir)
+        files = self.configFiles()
+        cls = type(self)
+        key = cache.key(files, os.path.abspath(self.configPath), "%s.%s" % (cls.__module__, cls.__name__),
+                        self.activeEnvironments(), self.environment, self.merge)
+        with measure(self._parseReport, "cache") as timing:
+            data = cache.get(key)
+            timing.info["hit"] = data is not None
+        if data is None:
+            fingerprint = cache.fingerprint(files)
+            context = self._includeContext()
+            merged = NestedDict(lazy=self._lazy)
+            self.mergeLayers(merged, self.loadLayers(context))
+            data = _toDict(merged)
+            # included files invalidate the entry just like the configuration files
+            cache.set(key, fingerprint + cache.fingerprint(context.dependencies), data)
+        self.update(data)
+
+    def loadLayers(self, context=None):
+        """
+        Read the configuration files and return a dict of environment name to
+        environment settings.
+        """
         d = {}
+        files = self.configFiles()
+        if context is None:
+            context = self._includeContext()
+
+        if self._workers and len(files) > 1:
+            # parsing is CPU bound, only processes get around the GIL
+            from concurrent.futures import ProcessPoolExecutor
+
+            with ProcessPoolExecutor(max_workers=self._workers) as executor:
+                results = list(executor.map(_parseFileDependencies, files,
+                                            [self._fileSections(path) for path in files],
+                                            [self.streamThreshold] * len(files)))
+            for path, (result, dependencies) in zip(files, results):
+                d.update(self._fileLayers(path, result))
+                context.dependencies.extend(dependencies)
+            return d
 
+        # files share the context, so fragments included from several files are parsed once
+        for path in files:
+            d.update(self.loadFile(path, context))
+        return d
+
+    def loadFile(self, path, context=None):
+        """
+        Parse a single configuration file and return a dict of environment name to
+        environment settings.
+        """
+        if context is None:
+            context = self._includeContext()
+        return self._fileLayers(path, _parseFile(path, self._fileSections(path), context))
+
+    def _includeContext(self):
+        # includes are relative to the configuration directory
         path = os.path.abspath(self.configPath)
-        if os.path.isfile(path):
-            with open(path, "r") as f:
-                d = (yaml.load(f.read(), Loader=_Loader) or {})
-        elif os.path.isdir(self.configPath):
-            for e in self._environments:
-                if os.path.exists(os.path.join(path, "%s.yml" % e)):
-                    with open(os.path.join(path, "%s.yml" % e), "r") as f:
-                        d[e] = (yaml.load(f.read(), Loader=_Loader) or {})
-        if self.merge:
-            for e in self._environments:
-                if e in d and self.getEnvironment(e) <= self.getEnvironment(self.environment):
-                    self.update(d[e])
-        else:
-            self.update(d.get(self.environment, {}))
+        context = _IncludeContext(path if os.path.isdir(path) else os.path.dirname(path), self.streamThreshold)
+        context.report = self._parseReport
+        return context
+
+    def _fileSections(self, path):
+        # a single configuration file holds a section per environment
+        if path == os.path.abspath(self.configPath):
+            active = self.activeEnvironments()
+            # the C loader is faster when every section is needed anyway
+            if not set(self.environmentGraph().names).issubset(active):
+                return active
+        return None
+
+    def _fileLayers(self, path, data):
+        if path == os.path.abspath(self.configPath):
+            return data if isinstance(data, dict) else {}
+        # <environment>.yml in directory mode
+        e = os.path.splitext(os.path.basename(path))[0]
+        return {e: (data or {})}
+
+    def mergeLayers(self, target, d):
+        for e in self.activeEnvironments():
+            if e in d:
+                with measure(self._parseReport, "merge", environment=e):
+                    target.update(d[e])
+
+    def reload(self, d=None):
+        """
+        Load the configuration files again and re-apply the command line arguments
+        given to parse(). d may be a dict of environment settings as returned by
+        loadLayers to avoid reading the files.
+
+        Returns the set of dotted paths whose values changed.
+        A yconf.schema.ValidationError is raised and the configuration is left
+        unchanged if the result violates the schema.
+        """
+        if self._argv is None:
+            raise RuntimeError("The configuration has to be parsed before it can be reloaded.")
+
+        fresh = NestedDict(self._defaults, lazy=self._lazy)
+        if self.configPath:
+            self.mergeLayers(fresh, self.loadLayers() if d is None else d)
+        self.loadEnviron(fresh)
+        self.parser.parse_args(self._argv, fresh)
+        # an invalid configuration is not taken over
+        self.validateSettings(fresh)
+
+        changed = set(change.dotted for change in diff(self, fresh))
+        for value in fresh.data.values():
+            if type(value) is NestedDict and value._owner is fresh:
+                self._adopt(value)
+        object.__setattr__(self, "data", fresh.data)
+        self._touch()
+        if self._trace is not None:
+            _setTrace(self, self._trace)
+        return changed
 
 
 __all__ = ["BaseConfiguration"]
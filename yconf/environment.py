@@ -0,0 +1,89 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+
+class EnvironmentGraph(object):
+    """
+    Configuration environments and the environments each of them inherits from.
+
+    parents maps every environment to a sequence of parent environments. The
+    merge plan of an environment lists its ancestors before the environment
+    itself, so that it overrides what it inherits, and later parents override
+    earlier ones. Plans are computed once, when the graph is built.
+    """
+
+    def __init__(self, parents):
+        self.parents = dict((name, tuple(p)) for name, p in parents.items())
+        for name, p in self.parents.items():
+            for parent in p:
+                if parent not in self.parents:
+                    raise ValueError("Unknown parent environment of %s: %s" % (name, parent))
+
+        self._plans = {}
+        for name in sorted(self.parents):
+            self._plan(name, [])
+        self.names = tuple(sorted(self.parents, key=lambda name: (len(self._plans[name]), name)))
+
+    @classmethod
+    def chain(cls, names):
+        """
+        Return a graph in which each environment inherits from the one before it.
+        """
+        return cls(dict((name, names[i - 1:i]) for i, name in enumerate(names)))
+
+    def _plan(self, name, stack):
+        if name in self._plans:
+            return self._plans[name]
+        if name in stack:
+            raise ValueError("Environment cycle: %s" % " -> ".join(stack[stack.index(name):] + [name]))
+
+        stack.append(name)
+        plan = []
+        for parent in self.parents[name]:
+            # shared ancestors are merged once, at their first position
+            plan.extend(e for e in self._plan(parent, stack) if e not in plan)
+        stack.pop()
+
+        plan.append(name)
+        self._plans[name] = tuple(plan)
+        return self._plans[name]
+
+    def plan(self, name):
+        """
+        Return the environments merged for name, in merge order.
+        """
+        try:
+            return self._plans[name]
+        except KeyError:
+            raise ValueError("Unknown environment: %s" % name)
+
+    def __contains__(self, name):
+        return name in self._plans
+
+    def __repr__(self):
+        return "<EnvironmentGraph %r>" % self.parents
+
+
+__all__ = ["EnvironmentGraph"]
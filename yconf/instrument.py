@@ -0,0 +1,145 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import timeit
+from contextlib import contextmanager
+
+
+class Timing(object):
+    """
+    Duration of one phase of parsing a configuration.
+
+    info holds the details of the phase, e.g. the path and the number of bytes
+    read for a file or the environment of a merge step.
+    """
+
+    __slots__ = ("phase", "seconds", "info")
+
+    def __init__(self, phase, seconds=0.0, **info):
+        self.phase = phase
+        self.seconds = seconds
+        self.info = info
+
+    def asDict(self):
+        d = dict(self.info)
+        d.update(phase=self.phase, seconds=self.seconds)
+        return d
+
+    def __repr__(self):
+        return "<Timing %s %.6fs %r>" % (self.phase, self.seconds, self.info)
+
+
+class ParseReport(object):
+    """
+    Timings recorded while parsing a configuration, see BaseConfiguration.
+
+    The phases are
+      parse       the whole of BaseConfiguration.parse
+      loadConfig  loading and merging the configuration files
+      cache       looking up the configuration cache, info: hit
+      read        reading a file, info: path, bytes
+                  (files above BaseConfiguration.streamThreshold are read while parsing)
+      yaml        parsing a file, info: path, nodes
+      merge       merging an environment, info: environment
+      environ     applying the environment variables
+      arguments   applying the command line arguments
+      validate    checking the schema
+
+    If a callback is given, it is called with every Timing as it is recorded.
+    """
+
+    def __init__(self, callback=None):
+        self.callback = callback
+        self.timings = []
+
+    @contextmanager
+    def measure(self, phase, **info):
+        timing = Timing(phase, **info)
+        start = timeit.default_timer()
+        try:
+            yield timing
+        finally:
+            timing.seconds = timeit.default_timer() - start
+            self.add(timing)
+
+    def add(self, timing):
+        self.timings.append(timing)
+        if self.callback is not None:
+            self.callback(timing)
+
+    def select(self, phase):
+        return [t for t in self.timings if t.phase == phase]
+
+    def total(self, phase):
+        return sum(t.seconds for t in self.select(phase))
+
+    def summary(self):
+        """
+        Return a dict of phase to count, total seconds and the sums of the
+        numeric details recorded for the phase.
+        """
+        result = {}
+        for timing in self.timings:
+            entry = result.setdefault(timing.phase, {"count": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += timing.seconds
+            for key, value in timing.info.items():
+                if isinstance(value, int) and not isinstance(value, bool):
+                    entry[key] = entry.get(key, 0) + value
+        return result
+
+    def asDicts(self):
+        return [t.asDict() for t in self.timings]
+
+
+@contextmanager
+def _nothing():
+    yield Timing(None)
+
+
+def measure(report, phase, **info):
+    """
+    Measure a phase in report, or do nothing if report is None.
+    """
+    if report is None:
+        return _nothing()
+    return report.measure(phase, **info)
+
+
+def countNodes(data):
+    """
+    Return the number of objects in the tree of dicts and lists data.
+    """
+    count = 1
+    if isinstance(data, dict):
+        for value in data.values():
+            count += countNodes(value)
+    elif isinstance(data, list):
+        for value in data:
+            count += countNodes(value)
+    return count
+
+
+__all__ = ["ParseReport", "Timing"]
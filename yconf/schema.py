@@ -0,0 +1,143 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Declarative validation of configurations.
+
+A schema maps dotted paths, or nested mappings of keys, to Fields. It is
+compiled once into a flat list of checks, which are run against a
+configuration with a single walk of the tree.
+"""
+
+from yconf.util import _pathTrie
+
+_MISSING = object()
+
+
+class ValidationError(ValueError):
+    """
+    Raised with every violation of a schema, errors is a list of
+    (dotted path, message) tuples.
+    """
+
+    def __init__(self, errors):
+        self.errors = errors
+        super(ValidationError, self).__init__(
+            "Invalid configuration:\n" + "\n".join("  %s: %s" % error for error in errors))
+
+
+class Field(object):
+    """
+    Constraints of a single setting.
+
+    type is a type or a tuple of types the value has to be an instance of, use
+    dict for nested sections. Integers are accepted for float, booleans are
+    only accepted for bool. min and max bound the value, choices lists the
+    allowed values.
+    """
+
+    def __init__(self, type=None, required=False, min=None, max=None, choices=None):
+        self.type = type
+        self.required = required
+        self.min = min
+        self.max = max
+        self.choices = tuple(choices) if choices is not None else None
+
+    def __repr__(self):
+        return "<Field %r>" % self.__dict__
+
+
+def _typeName(types):
+    return " or ".join(t.__name__ for t in types)
+
+
+def _checkType(value, types):
+    if isinstance(value, bool):
+        return bool in types
+    if dict in types and hasattr(value, "items"):
+        return True
+    if float in types and isinstance(value, int):
+        return True
+    return isinstance(value, types)
+
+
+class Schema(object):
+    """
+    A schema compiled into a flat list of (path, dotted path, types, Field) checks.
+    """
+
+    def __init__(self, fields):
+        self.checks = []
+        self._compile(fields, ())
+        self.paths = [check[0] for check in self.checks]
+        self._trie = _pathTrie(self.paths)
+
+    def _compile(self, fields, prefix):
+        for key, field in sorted(fields.items(), key=lambda item: str(item[0])):
+            path = prefix + (tuple(key.split(".")) if isinstance(key, str) else (key,))
+            if isinstance(field, dict):
+                self._compile(field, path)
+                continue
+            if not isinstance(field, Field):
+                raise TypeError("Expected a Field or a mapping for %s, got %r" % (".".join(path), field))
+            types = field.type if field.type is None or isinstance(field.type, tuple) else (field.type,)
+            self.checks.append((path, ".".join(str(k) for k in path), types, field))
+
+    def errors(self, config):
+        """
+        Return the list of (dotted path, message) tuples of all violations in the
+        NestedDict config.
+        """
+        errors = []
+        values = config._lookupTrie(self.paths, self._trie, _MISSING)
+        for (path, dotted, types, field), value in zip(self.checks, values):
+            if value is _MISSING:
+                if field.required:
+                    errors.append((dotted, "is required"))
+                continue
+            if types is not None and not _checkType(value, types):
+                errors.append((dotted, "expected %s, got %s" % (_typeName(types), type(value).__name__)))
+                continue
+            if field.choices is not None and value not in field.choices:
+                errors.append((dotted, "%r is not one of %s" % (value, ", ".join(repr(c) for c in field.choices))))
+            try:
+                if field.min is not None and value < field.min:
+                    errors.append((dotted, "%r is less than the minimum %r" % (value, field.min)))
+                if field.max is not None and value > field.max:
+                    errors.append((dotted, "%r is greater than the maximum %r" % (value, field.max)))
+            except TypeError:
+                errors.append((dotted, "%r cannot be compared with the bounds" % (value,)))
+        return errors
+
+    def validate(self, config):
+        """
+        Raise a ValidationError listing every violation in config.
+        """
+        errors = self.errors(config)
+        if errors:
+            raise ValidationError(errors)
+
+
+__all__ = ["Field", "Schema", "ValidationError"]
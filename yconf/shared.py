@@ -0,0 +1,291 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+"""
+Publish a parsed configuration into a shared memory segment, so that the
+workers of a pre-fork server read one physical copy instead of each keeping
+their own tree.
+
+The segment holds a compact, read-only encoding of the tree. Mappings are
+tables of (key, value) offsets sorted by key, values are marshalled, or
+pickled if marshal cannot encode them, and decoded on access only. Values
+that cannot be encoded at all are left out.
+"""
+
+import marshal
+import struct
+import sys
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from multiprocessing import shared_memory
+
+from yconf.config import _options
+from yconf.util import _children, _splitChildren
+
+_MAGIC = b"YCS1"
+# magic, offset of the root mapping
+_HEADER = struct.Struct("<4sI")
+# tag, number of entries of a mapping or length of a value
+_NODE = struct.Struct("<cI")
+# key offset, key length, value offset
+_ENTRY = struct.Struct("<III")
+
+_MAPPING, _MARSHAL, _PICKLE = b"M", b"V", b"P"
+
+# names of the segments published by this process, or by the process it was forked
+# from, whose resource tracker it shares
+_published = set()
+
+
+def _dumpKey(key):
+    # version 2 does not use references, so equal keys encode to equal bytes
+    return marshal.dumps(key, 2)
+
+
+def _encode(config):
+    out = bytearray(_HEADER.size)
+    memo = {}
+
+    def leaf(value):
+        try:
+            return _MARSHAL, marshal.dumps(value, 2)
+        except ValueError:
+            pass
+        try:
+            return _PICKLE, pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return None, None
+
+    def mapping(node, skip=()):
+        # subtrees reachable under several keys, e.g. aliases, are stored once
+        if id(node) in memo:
+            return memo[id(node)][1]
+
+        entries = []
+        for key, value in _splitChildren(node).items():
+            if key in skip:
+                continue
+            try:
+                k = _dumpKey(key)
+            except ValueError:
+                continue
+            if _children(value) is not None:
+                offset = mapping(value)
+            else:
+                tag, data = leaf(value)
+                if tag is None:
+                    continue
+                offset = len(out)
+                out.extend(_NODE.pack(tag, len(data)))
+                out.extend(data)
+            entries.append((k, offset))
+        entries.sort()
+
+        keys = []
+        for k, offset in entries:
+            keys.append((len(out), len(k), offset))
+            out.extend(k)
+        offset = len(out)
+        out.extend(_NODE.pack(_MAPPING, len(keys)))
+        for entry in keys:
+            out.extend(_ENTRY.pack(*entry))
+        # the node is kept alive, so that its id is not reused by the temporary
+        # dicts of split dotted keys
+        memo[id(node)] = (node, offset)
+        return offset
+
+    # the options of BaseConfiguration, such as the argument parser, are not settings
+    root = mapping(config, _options)
+    _HEADER.pack_into(out, 0, _MAGIC, root)
+    return out
+
+
+def publish(config, name=None):
+    """
+    Write config into a new shared memory segment and return the
+    multiprocessing.shared_memory.SharedMemory. The publishing process owns
+    the segment and has to close and unlink it once the workers are done.
+    """
+    data = _encode(config)
+    segment = shared_memory.SharedMemory(name=name, create=True, size=len(data))
+    segment.buf[:len(data)] = data
+    _published.add(segment._name)
+    return segment
+
+
+def attach(name):
+    """
+    Attach to the segment published under name and return its root SharedConfig.
+    """
+    if sys.version_info >= (3, 13):
+        segment = shared_memory.SharedMemory(name=name, track=False)
+    else:
+        segment = shared_memory.SharedMemory(name=name)
+        # only the publishing process may unlink the segment. Forked workers share
+        # its resource tracker, unregistering there would drop the publisher's entry
+        if segment._name not in _published:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(segment._name, "shared_memory")
+    root = SharedConfig(segment.buf)
+    object.__setattr__(root, "_segment", segment)
+    return root
+
+
+class SharedConfig(object):
+    """
+    Read-only view of a mapping in a published configuration, with the item,
+    attribute and dotted access of NestedDict.
+
+    Nested mappings are returned as SharedConfig views, other values are
+    decoded from the segment on every access.
+    """
+
+    __slots__ = ("_buf", "_offset", "_count", "_segment")
+
+    def __init__(self, buf):
+        buf = memoryview(buf).toreadonly()
+        magic, offset = _HEADER.unpack_from(buf, 0)
+        if magic != _MAGIC:
+            raise ValueError("Not a published configuration")
+        self._init(buf, offset)
+
+    def _init(self, buf, offset):
+        object.__setattr__(self, "_buf", buf)
+        object.__setattr__(self, "_offset", offset)
+        object.__setattr__(self, "_count", _NODE.unpack_from(buf, offset)[1])
+        object.__setattr__(self, "_segment", None)
+
+    def _entry(self, i):
+        return _ENTRY.unpack_from(self._buf, self._offset + _NODE.size + i * _ENTRY.size)
+
+    def _key(self, i):
+        offset, length, _ = self._entry(i)
+        return self._buf[offset:offset + length].tobytes()
+
+    def _find(self, key):
+        try:
+            k = _dumpKey(key)
+        except ValueError:
+            return None
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._key(mid)
+            if probe < k:
+                lo = mid + 1
+            elif probe > k:
+                hi = mid
+            else:
+                return self._entry(mid)[2]
+        return None
+
+    def _value(self, offset):
+        tag, length = _NODE.unpack_from(self._buf, offset)
+        if tag == _MAPPING:
+            # nested views share the buffer of the root
+            view = SharedConfig.__new__(SharedConfig)
+            view._init(self._buf, offset)
+            return view
+        data = self._buf[offset + _NODE.size:offset + _NODE.size + length]
+        if tag == _PICKLE:
+            return pickle.loads(data)
+        return marshal.loads(data)
+
+    def __getitem__(self, key):
+        offset = self._find(key)
+        if offset is None:
+            raise KeyError(key)
+        return self._value(offset)
+
+    def __getattr__(self, key):
+        value = self
+        for k in key.split("."):
+            if type(value) is not SharedConfig:
+                raise AttributeError(key)
+            offset = value._find(k)
+            if offset is None:
+                raise AttributeError(key)
+            value = value._value(offset)
+        return value
+
+    def __setattr__(self, key, value):
+        raise AttributeError("SharedConfig is read-only")
+
+    def __setitem__(self, key, value):
+        raise TypeError("SharedConfig is read-only")
+
+    def get(self, key, default=None):
+        offset = self._find(key)
+        return default if offset is None else self._value(offset)
+
+    def has(self, key):
+        return self._find(key) is not None
+
+    def __contains__(self, key):
+        return self.has(key)
+
+    def lookup(self, path, default=None):
+        value = self
+        for key in path:
+            offset = value._find(key) if type(value) is SharedConfig else None
+            if offset is None:
+                return default
+            value = value._value(offset)
+        return value
+
+    def keys(self):
+        return [marshal.loads(self._key(i)) for i in range(self._count)]
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def values(self):
+        return [self._value(self._entry(i)[2]) for i in range(self._count)]
+
+    def items(self):
+        return list(zip(self.keys(), self.values()))
+
+    def __len__(self):
+        return self._count
+
+    def __repr__(self):
+        return "<SharedConfig (%s)>" % repr(dict(self.items()))
+
+    def close(self):
+        """
+        Detach from the segment if this view was returned by attach. Views and
+        values obtained from it must not be used afterwards.
+        """
+        if self._segment is not None:
+            self._buf.release()
+            self._segment.close()
+            object.__setattr__(self, "_segment", None)
+
+
+__all__ = ["SharedConfig", "attach", "publish"]
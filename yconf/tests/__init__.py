@@ -23,19 +23,36 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
+import sys
 from unittest import TestSuite
 
 
 def test_suite():
     from yconf.tests import (
+        test_cache,
         test_config,
+        test_environment,
+        test_instrument,
         test_parser,
-        test_util
+        test_schema,
+        test_util,
+        test_watch
         )
     modules = [
+        test_cache,
         test_config,
+        test_environment,
+        test_instrument,
         test_parser,
-        test_util
+        test_schema,
+        test_util,
+        test_watch
         ]
+    if sys.version_info >= (3, 5):
+        from yconf.tests import test_aio
+        modules.append(test_aio)
+    if sys.version_info >= (3, 8):
+        from yconf.tests import test_shared
+        modules.append(test_shared)
     suites = map(lambda x: x.test_suite(), modules)
     return TestSuite(suites)
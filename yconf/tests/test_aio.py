@@ -0,0 +1,127 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+from unittest import skipIf
+
+import fixtures
+from testtools import TestCase
+
+try:
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+
+    from yconf import aio
+except (ImportError, SyntaxError):
+    # yconf.aio requires python 3.5, test discovery imports this module anyway
+    aio = None
+
+from yconf.config import BaseConfiguration, _IncludeContext
+from yconf.util import _toDict
+from yconf.tests.test_config import YamlFileFixture, YamlConfigDirFixture
+
+
+class ArgsConfiguration(BaseConfiguration):
+
+    def makeParser(self):
+        parser = super(ArgsConfiguration, self).makeParser()
+        parser.add_argument("-a", dest="a")
+        parser.add_argument("-x", dest="e.x", default="x")
+        return parser
+
+
+@skipIf(aio is None, "requires python 3.5")
+class AsyncParseTest(TestCase):
+
+    def run_until_complete(self, coroutine):
+        loop = asyncio.new_event_loop()
+        try:
+            return loop.run_until_complete(coroutine)
+        finally:
+            loop.close()
+
+    def assertSameAsSync(self, args, **kwargs):
+        expected = ArgsConfiguration(**kwargs)
+        expected.parse(args=args)
+
+        bc = ArgsConfiguration(**kwargs)
+        self.run_until_complete(aio.parse(bc, args))
+        self.assertEqual(self.settings(expected), self.settings(bc))
+        return bc
+
+    def settings(self, config):
+        return dict((k, v) for k, v in _toDict(config).items() if k not in ("parser", "_configParser"))
+
+    def test_configFile(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = self.assertSameAsSync(["-c", f.config, "-e", "staging", "-a", "1"])
+        self.assertEqual("1", bc.a)
+        self.assertEqual("B", bc.b)
+        self.assertEqual("x", bc.e.x)
+        self.assertSameAsSync(["-c", f.config, "-e", "development"], merge=False)
+
+    def test_configDirectory(self):
+        f = self.useFixture(YamlConfigDirFixture())
+
+        for e in ("production", "staging", "development"):
+            self.assertSameAsSync(["-c", f.dir.path, "-e", e])
+
+    def test_includesParsedOnce(self):
+        path = self.useFixture(fixtures.TempDir()).path
+        with open(os.path.join(path, "shared.yml"), "w") as f:
+            f.write("level: debug\n")
+        for e in ("production", "staging"):
+            with open(os.path.join(path, "%s.yml" % e), "w") as f:
+                f.write("%s: !include shared.yml\n" % e)
+
+        loads = []
+        load = _IncludeContext.load
+        self.patch(_IncludeContext, "load", lambda ctx, p, sections=None:
+                   loads.append(p) or load(ctx, p, sections))
+
+        with ThreadPoolExecutor(2) as executor:
+            bc = ArgsConfiguration()
+            self.run_until_complete(aio.parse(bc, ["-c", path, "-e", "staging"], executor))
+        self.assertEqual(("debug", "debug"), (bc.production.level, bc.staging.level))
+        self.assertEqual(1, loads.count(os.path.join(path, "shared.yml")))
+
+    def test_cache(self):
+        f = self.useFixture(YamlFileFixture())
+        cacheDir = self.useFixture(fixtures.TempDir()).path
+
+        with ThreadPoolExecutor(2) as executor:
+            for _ in range(2):
+                bc = ArgsConfiguration(cacheDir=cacheDir)
+                self.run_until_complete(aio.parse(bc, ["-c", f.config, "-e", "staging"], executor))
+                self.assertEqual("B", bc.b)
+
+    def test_withoutConfig(self):
+        self.assertSameAsSync(["-a", "1"])
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
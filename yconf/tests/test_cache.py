@@ -0,0 +1,123 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import yaml
+
+import fixtures
+from testtools import TestCase
+
+from yconf.cache import ConfigCache
+from yconf.config import BaseConfiguration
+from yconf.tests.test_config import YamlFileFixture, YamlConfigDirFixture
+
+
+class CountingConfiguration(BaseConfiguration):
+
+    loads = 0
+
+    def loadLayers(self, context=None):
+        CountingConfiguration.loads += 1
+        return super(CountingConfiguration, self).loadLayers(context)
+
+
+class ConfigCacheTest(TestCase):
+
+    def setUp(self):
+        super(ConfigCacheTest, self).setUp()
+        self.cacheDir = self.useFixture(fixtures.TempDir()).path
+        CountingConfiguration.loads = 0
+
+    def parse(self, *args):
+        bc = CountingConfiguration(cacheDir=self.cacheDir)
+        bc.parse(args=list(args))
+        return bc
+
+    def test_warmStartSkipsParsing(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = self.parse("-c", f.config, "-e", "staging")
+        self.assertEqual(1, CountingConfiguration.loads)
+        self.assertEqual("B", bc.b)
+
+        bc = self.parse("-c", f.config, "-e", "staging")
+        self.assertEqual(1, CountingConfiguration.loads)
+        self.assertEqual("a", bc.a)
+        self.assertEqual("B", bc.b)
+        self.assertEqual("g", bc.e.f)
+
+    def test_keyedOnEnvironment(self):
+        f = self.useFixture(YamlConfigDirFixture())
+
+        self.assertEqual("b", self.parse("-c", f.dir.path).b)
+        self.assertEqual("C", self.parse("-c", f.dir.path, "-e", "development").c)
+        self.assertEqual(2, CountingConfiguration.loads)
+
+    def test_editInvalidatesEntry(self):
+        f = self.useFixture(YamlFileFixture())
+        self.parse("-c", f.config)
+
+        with open(f.config, "w") as fp:
+            fp.write(yaml.dump({"production": {"a": "x"}}))
+
+        bc = self.parse("-c", f.config)
+        self.assertEqual(2, CountingConfiguration.loads)
+        self.assertEqual("x", bc.a)
+        self.assertFalse(bc.has("b"))
+
+    def test_includeInvalidatesEntry(self):
+        path = self.useFixture(fixtures.TempDir()).path
+        with open(os.path.join(path, "production.yml"), "w") as fp:
+            fp.write("services: !include_dir services\n")
+        os.mkdir(os.path.join(path, "services"))
+        with open(os.path.join(path, "services", "web.yml"), "w") as fp:
+            fp.write("port: 80\n")
+
+        self.assertEqual(80, self.parse("-c", path).services.web.port)
+        self.assertEqual(80, self.parse("-c", path).services.web.port)
+        self.assertEqual(1, CountingConfiguration.loads)
+
+        with open(os.path.join(path, "services", "web.yml"), "w") as fp:
+            fp.write("port: 8080\n")
+        self.assertEqual(8080, self.parse("-c", path).services.web.port)
+        self.assertEqual(2, CountingConfiguration.loads)
+
+        with open(os.path.join(path, "services", "db.yml"), "w") as fp:
+            fp.write("port: 5432\n")
+        self.assertEqual(5432, self.parse("-c", path).services.db.port)
+        self.assertEqual(3, CountingConfiguration.loads)
+
+    def test_corruptEntryIsMiss(self):
+        cache = ConfigCache(self.cacheDir)
+        with open(os.path.join(self.cacheDir, "broken"), "wb") as f:
+            f.write(b"not a pickle")
+
+        self.assertIsNone(cache.get("broken"))
+        self.assertIsNone(cache.get("missing"))
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
@@ -30,7 +30,13 @@ import fixtures
 from testtools import TestCase, ExpectedException
 from testtools.matchers import LessThan, HasLength
 
-from yconf.config import _Loader as Loader, BaseConfiguration
+from yaml.composer import ComposerError
+from yaml.constructor import ConstructorError
+from yaml.parser import ParserError
+
+from yconf.config import (_Loader as Loader, _PyLoader, _CLoader, _CStreamLoader, _loadSections,
+                          _IncludeContext, BaseConfiguration)
+from yconf.util import NestedDict, trace
 
 
 class BaseYamlFileFixture(fixtures.Fixture):
@@ -92,6 +98,153 @@ class LoaderTest(TestCase):
         with ExpectedException(Exception, ".+'test_level'.+'test-level'.+"):
             yaml.load(yaml.dump(data), Loader=Loader)
 
+    def test_loadersAgree(self):
+        data = {"testcase": {"test-level": 1, "nested": {"a-b": [1, 2]}}}
+        dump = yaml.dump(data)
+
+        expected = yaml.load(dump, Loader=_PyLoader)
+        self.assertEqual(1, expected["testcase"]["test_level"])
+        self.assertEqual([1, 2], expected["testcase"]["nested"]["a_b"])
+        if _CLoader is not None:
+            self.assertEqual(expected, yaml.load(dump, Loader=_CLoader))
+
+    def test_preferCLoader(self):
+        if _CLoader is None:
+            self.assertIs(_PyLoader, Loader)
+        else:
+            self.assertIs(_CLoader, Loader)
+            self.assertTrue(issubclass(Loader, yaml.CSafeLoader))
+
+
+class LoadSectionsTest(TestCase):
+
+    document = """
+development: &dev
+  c: C
+  timeout: !!int "not an int"
+production: &prod
+  a: a
+  nested-key: {x: 1}
+staging:
+  <<: *prod
+  b: B
+"""
+
+    def loaders(self):
+        return [l for l in (_PyLoader, _CStreamLoader) if l is not None]
+
+    def test_selectedSectionsOnly(self):
+        for loader in self.loaders():
+            d = _loadSections(self.document, ["production", "staging"], loader)
+            self.assertEqual(["production", "staging"], sorted(d.keys()))
+            self.assertEqual({"x": 1}, d["production"]["nested_key"])
+            self.assertEqual("B", d["staging"]["b"])
+
+    def test_aliasToSkippedSection(self):
+        for loader in self.loaders():
+            d = _loadSections(self.document, ["staging"], loader)
+            self.assertEqual(["staging"], list(d.keys()))
+            self.assertEqual("a", d["staging"]["a"])
+
+    def test_sameAsFullLoad(self):
+        document = yaml.dump({"production": {"a": [1, 2, {"b-c": None}]}, "staging": {"d": 1.5}})
+        for loader in self.loaders():
+            self.assertEqual(yaml.load(document, Loader=Loader),
+                             _loadSections(document, ["production", "staging"], loader))
+
+    def test_nonMappingDocument(self):
+        for loader in self.loaders():
+            self.assertIsNone(_loadSections("", ["production"], loader))
+            self.assertEqual([1, 2], _loadSections("[1, 2]", ["production"], loader))
+
+    def test_singleDocument(self):
+        for loader in self.loaders():
+            with ExpectedException(ComposerError, "expected a single document.*"):
+                _loadSections("production: {}\n---\nstaging: {}\n", ["production"], loader)
+
+
+class IncludeTest(TestCase):
+
+    def setUp(self):
+        super(IncludeTest, self).setUp()
+        self.dir = self.useFixture(fixtures.TempDir()).path
+
+    def write(self, name, content):
+        path = os.path.join(self.dir, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as f:
+            f.write(content)
+        return path
+
+    def test_streamLargeFiles(self):
+        self.write("shared.yml", "level: debug\n")
+        config = self.write("config.yml", "production:\n  name: \xe9\n  logging: !include shared.yml\n"
+                                          "staging:\n  b: B\n")
+        bad = self.write("bad.yml", "a: [\n")
+
+        context = _IncludeContext(self.dir, streamThreshold=0)
+        self.assertEqual({"production": {"name": u"\xe9", "logging": {"level": "debug"}}},
+                         context.load(config, ["production"]))
+        with ExpectedException(ParserError, "(?s).*%s" % bad):
+            context.load(bad)
+        with ExpectedException(ParserError, "(?s).*%s" % bad):
+            _IncludeContext(self.dir).load(bad)
+
+        nested = self.write("nested.yml", "production: !include bad.yml\n")
+        with ExpectedException(ParserError, '(?s).*"%s"(?!.*nested)' % bad):
+            _IncludeContext(self.dir).load(nested)
+
+        class StreamingConfiguration(BaseConfiguration):
+            streamThreshold = 0
+
+        bc = StreamingConfiguration()
+        bc.parse(args=["-c", config, "-e", "staging"])
+        self.assertEqual(("debug", "B"), (bc.logging.level, bc.b))
+
+    def test_include(self):
+        self.write("shared.yml", "level: debug\nsub: !include fragments/sub.yml\n")
+        self.write("fragments/sub.yml", "x: 1\n")
+        config = self.write("config.yml", "production:\n  logging: !include shared.yml\n"
+                                          "staging:\n  other: !include shared.yml\n")
+
+        loads = []
+        load = _IncludeContext.load
+        self.patch(_IncludeContext, "load", lambda ctx, path, sections=None:
+                   loads.append(path) or load(ctx, path, sections))
+
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", config, "-e", "staging"])
+        self.assertEqual("debug", bc.logging.level)
+        self.assertEqual(1, bc.logging.sub.x)
+        self.assertEqual(1, bc.other.sub.x)
+        self.assertEqual(1, loads.count(os.path.join(self.dir, "shared.yml")))
+
+    def test_includeDir(self):
+        self.write("services/web-app.yml", "port: 80\n")
+        self.write("services/db.yml", "port: 5432\n")
+        self.write("services/notes.txt", "ignored")
+        self.write("production.yml", "services: !include_dir services\n")
+
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", self.dir])
+        self.assertEqual(80, bc.services.web_app.port)
+        self.assertEqual(5432, bc.services.db.port)
+        self.assertEqual(["db", "web-app", "web_app"], sorted(bc.services.keys()))
+
+    def test_includeCycle(self):
+        self.write("a.yml", "b: !include b.yml\n")
+        self.write("b.yml", "a: !include a.yml\n")
+        config = self.write("config.yml", "production: !include a.yml\n")
+
+        with ExpectedException(ConstructorError, "(?s).*include cycle.*a.yml -> .*b.yml -> .*a.yml"):
+            BaseConfiguration().parse(args=["-c", config])
+
+    def test_includeOutsideConfiguration(self):
+        with ExpectedException(ConstructorError, "(?s).*only supported in configuration files.*"):
+            yaml.load("a: !include b.yml", Loader=Loader)
+
+
 class BaseConfigurationTest(TestCase):
 
     def test_getEnvironment(self):
@@ -180,6 +333,202 @@ class BaseConfigurationTest(TestCase):
         self.assertEqual("B", bc["b"])
         self.assertEqual("C", bc["c"])
 
+    def test_configDirectoryParsesActiveEnvironmentsOnly(self):
+        f = self.useFixture(YamlConfigDirFixture())
+        with open(os.path.join(f.dir.path, "development.yml"), "w") as fp:
+            fp.write("{ this is not: [ valid yaml")
+
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.dir.path, "-e", "staging"])
+        self.assertEqual("a", bc["a"])
+        self.assertEqual("B", bc["b"])
+        del bc
+
+        bc = BaseConfiguration(merge=False)
+        bc.parse(args=["-c", f.dir.path, "-e", "staging"])
+        self.assertFalse(bc.has("a"))
+        self.assertEqual("B", bc["b"])
+
+    def test_configDirectoryWorkers(self):
+        f = self.useFixture(YamlConfigDirFixture())
+
+        bc = BaseConfiguration(workers=2)
+        bc.parse(args=["-c", f.dir.path, "-e", "development"])
+        self.assertEqual("a", bc["a"])
+        self.assertEqual("B", bc["b"])
+        self.assertEqual("C", bc["c"])
+        self.assertEqual("g", bc.e.f)
+
+    def test_activeEnvironments(self):
+        bc = BaseConfiguration()
+        bc.environment = "staging"
+        self.assertEqual(["production", "staging"], bc.activeEnvironments())
+
+        bc = BaseConfiguration(merge=False)
+        bc.environment = "staging"
+        self.assertEqual(["staging"], bc.activeEnvironments())
+
+    def test_environmentGraph(self):
+
+        class RegionConfiguration(BaseConfiguration):
+            _environmentParents = {"production": [], "eu": ["production"], "eu-host1": ["eu"], "us": ["production"]}
+
+        data = {"production": {"a": "a", "b": "b", "c": "c"},
+                "eu": {"b": "B"},
+                "eu-host1": {"c": "C"},
+                "us": {"a": "A"}}
+        for f in (self.useFixture(YamlFileFixture(data)), self.useFixture(YamlConfigDirFixture(data))):
+            path = getattr(f, "config", f.dir.path)
+            bc = RegionConfiguration()
+            bc.parse(args=["-c", path, "-e", "eu-host1"])
+            self.assertEqual(["production", "eu", "eu-host1"], bc.activeEnvironments())
+            self.assertEqual(("a", "B", "C"), (bc.a, bc.b, bc.c))
+
+        self.assertIs(RegionConfiguration.environmentGraph(), RegionConfiguration.environmentGraph())
+        with ExpectedException(SystemExit):
+            RegionConfiguration().parse(args=["-e", "staging"])
+
+    def test_environmentGraphWithoutProduction(self):
+
+        class SiteConfiguration(BaseConfiguration):
+            _environmentParents = {"base": [], "site": ["base"]}
+
+        f = self.useFixture(YamlFileFixture({"base": {"a": "a", "b": "b", "environments": "x"},
+                                             "site": {"b": "B"}}))
+        bc = SiteConfiguration()
+        bc.parse(args=["-c", f.config])
+        self.assertEqual("base", bc.environment)
+        self.assertEqual(("a", "b", "x"), (bc.a, bc.b, bc.environments))
+
+        bc = SiteConfiguration()
+        bc.parse(args=["-c", f.config, "-e", "site"])
+        self.assertEqual(("a", "B"), (bc.a, bc.b))
+
+    def test_optionsAreNotSettings(self):
+        f = self.useFixture(YamlFileFixture({"production": {"workers": 2, "indexed": True, "cacheDir": "/x"}}))
+
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config])
+        bc.reload()
+        self.assertEqual((None, False, None), (bc._workers, bc._indexed, bc._cacheDir))
+        self.assertEqual((2, True, "/x"), (bc.workers, bc.indexed, bc.cacheDir))
+        self.assertIsNone(bc._index)
+
+    def test_fileSections(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config, "-e", "staging"])
+        self.assertEqual(["production", "staging"], bc._fileSections(f.config))
+
+        # all sections are needed, which the C loader reads faster
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config, "-e", "development"])
+        self.assertIsNone(bc._fileSections(f.config))
+        self.assertEqual(("a", "B", "C"), (bc.a, bc.b, bc.c))
+
+    def test_lazy(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = BaseConfiguration(lazy=True)
+        bc.parse(args=["-c", f.config, "-e", "staging"])
+        self.assertIs(dict, type(bc.data["e"]))
+        self.assertEqual("g", bc.e.f)
+        self.assertEqual("B", bc.b)
+        self.assertEqual(set(), bc.reload())
+
+        f = self.useFixture(YamlFileFixture({"production": {"s": {"a.b": 1}}}))
+        bc = BaseConfiguration(lazy=True)
+        bc.parse(args=["-c", f.config])
+        self.assertEqual(1, bc.s.a.b)
+        self.assertEqual(set(), bc.reload())
+
+    def test_environOverrides(self):
+
+        class EnvConfiguration(BaseConfiguration):
+            envPrefix = "APP_"
+
+        bc = EnvConfiguration()
+        target = NestedDict({"log-level": "info", "log_level": "info", "logLevel": "info",
+                             "server": {"max-connections": 1, "Host": "a"}})
+        overrides = bc.environOverrides(target, environ={"APP_LOGGING__LEVEL": "debug",
+                                                         "APP_SERVER__PORT": "8080",
+                                                         "APP_SERVER__MAX_CONNECTIONS": "10",
+                                                         "APP_LOG_LEVEL": "warning",
+                                                         "APP_LOGLEVEL": "error",
+                                                         "APP_SERVER__HOST": "b",
+                                                         "APP_DEBUG": "true",
+                                                         "APP_EMPTY": "",
+                                                         "APP_LIST": "[1, 2]",
+                                                         "APP_INVALID____KEY": "1",
+                                                         "OTHER_KEY": "1"})
+        self.assertEqual({"logging": {"level": "debug"},
+                          "server": {"port": 8080, "max-connections": 10, "Host": "b"},
+                          "log_level": "warning",
+                          "log-level": "warning",
+                          "logLevel": "error",
+                          "debug": True,
+                          "empty": None,
+                          "list": "[1, 2]"}, overrides)
+        self.assertEqual({}, BaseConfiguration().environOverrides(environ={"APP_DEBUG": "true"}))
+
+    def test_environPrecedence(self):
+
+        class EnvConfiguration(BaseConfiguration):
+            envPrefix = "APP_"
+
+            def makeParser(_self):
+                parser = super(EnvConfiguration, _self).makeParser()
+                parser.add_argument("-a", dest="a")
+                return parser
+
+        f = self.useFixture(YamlFileFixture())
+        self.useFixture(fixtures.EnvironmentVariable("APP_A", "env"))
+        self.useFixture(fixtures.EnvironmentVariable("APP_B", "env"))
+        self.useFixture(fixtures.EnvironmentVariable("APP_E__F", "env"))
+
+        bc = EnvConfiguration()
+        bc.parse(args=["-c", f.config, "-a", "cli"])
+        self.assertEqual(("cli", "env", "c", "env"), (bc.a, bc.b, bc.c, bc.e.f))
+
+        self.useFixture(fixtures.EnvironmentVariable("APP_C", "3"))
+        self.assertEqual(set(["c"]), bc.reload())
+        self.assertEqual(3, bc.c)
+
+    def test_environOptions(self):
+
+        class EnvConfiguration(BaseConfiguration):
+            envPrefix = "APP_"
+
+        f = self.useFixture(YamlFileFixture())
+        for name in ("APP_PARSER", "APP_ENVIRONMENT", "APP_CONFIGPATH", "APP_MERGE"):
+            self.useFixture(fixtures.EnvironmentVariable(name, "staging"))
+
+        bc = EnvConfiguration()
+        bc.parse(args=["-c", f.config])
+        self.assertEqual(("production", f.config, True), (bc.environment, bc.configPath, bc.merge))
+        self.assertEqual(("a", "b"), (bc.a, bc.b))
+        self.assertEqual(set(), bc.reload())
+        self.assertEqual({}, bc.environOverrides(bc))
+
+    def test_indexed(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = BaseConfiguration(indexed=True)
+        bc.parse(args=["-c", f.config])
+        self.assertEqual("g", bc._index["e.f"])
+        self.assertEqual("g", getattr(bc, "e.f"))
+
+    def test_traceAccess(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = BaseConfiguration(traceAccess=True)
+        bc.parse(args=["-c", f.config])
+        self.assertEqual([], trace(bc).report())
+
+        self.assertEqual("g", bc.e.f)
+        self.assertEqual(["a", "b", "c"], trace(bc).unread())
+
     def test_parse(self):
 
         class TestConfiguration(BaseConfiguration):
@@ -199,6 +548,45 @@ class BaseConfigurationTest(TestCase):
         self.assertEqual("C", bc["c"])
         self.assertEqual("2", bc["x"])
 
+    def test_parserCache(self):
+
+        class TestConfiguration(BaseConfiguration):
+
+            def makeParser(_self):
+                parser = super(TestConfiguration, _self).makeParser()
+                parser.add_argument("-a", dest="a")
+                return parser
+
+        first, second = TestConfiguration(), TestConfiguration()
+        self.assertIs(first.parser, second.parser)
+        self.assertIs(first._configParser, second._configParser)
+        self.assertIsNot(first.parser, BaseConfiguration().parser)
+
+        second.parse(args=["-a", "1"])
+        self.assertEqual("1", second.a)
+        self.assertFalse(first.has("a"))
+
+        def makeParser(_self):
+            parser = BaseConfiguration.makeParser(_self)
+            parser.add_argument("-b", dest="b")
+            return parser
+
+        TestConfiguration.makeParser = makeParser
+        bc = TestConfiguration()
+        self.assertIsNot(first.parser, bc.parser)
+        bc.parse(args=["-b", "2"])
+        self.assertEqual("2", bc.b)
+
+        TestConfiguration.invalidateParser()
+        self.assertIsNot(bc.parser, TestConfiguration().parser)
+
+    def test_parserCacheDisabled(self):
+
+        class TestConfiguration(BaseConfiguration):
+            cacheParser = False
+
+        self.assertIsNot(TestConfiguration().parser, TestConfiguration().parser)
+
     def test_parse_default_args(self):
 
         class TestConfiguration(BaseConfiguration):
@@ -0,0 +1,67 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from testtools import TestCase, ExpectedException
+
+from yconf.environment import EnvironmentGraph
+
+
+class EnvironmentGraphTest(TestCase):
+
+    def test_chain(self):
+        graph = EnvironmentGraph.chain(("production", "staging", "development"))
+
+        self.assertEqual(("production",), graph.plan("production"))
+        self.assertEqual(("production", "staging", "development"), graph.plan("development"))
+        self.assertEqual(("production", "staging", "development"), graph.names)
+
+    def test_multipleParents(self):
+        graph = EnvironmentGraph({"production": [],
+                                  "eu": ["production"],
+                                  "canary": ["production"],
+                                  "eu-canary": ["eu", "canary"],
+                                  "host1": ["eu-canary"]})
+
+        self.assertEqual(("production", "eu", "canary", "eu-canary", "host1"), graph.plan("host1"))
+        self.assertIs(graph.plan("host1"), graph.plan("host1"))
+        self.assertIn("eu", graph)
+        self.assertNotIn("us", graph)
+
+    def test_unknownEnvironment(self):
+        graph = EnvironmentGraph.chain(("production",))
+
+        with ExpectedException(ValueError, "Unknown environment: staging"):
+            graph.plan("staging")
+        with ExpectedException(ValueError, "Unknown parent environment of eu: production"):
+            EnvironmentGraph({"eu": ["production"]})
+
+    def test_cycle(self):
+        with ExpectedException(ValueError, "Environment cycle: a -> b -> a"):
+            EnvironmentGraph({"a": ["b"], "b": ["a"], "c": []})
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
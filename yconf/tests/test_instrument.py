@@ -0,0 +1,109 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+
+import fixtures
+from testtools import TestCase
+
+from yconf.config import BaseConfiguration
+from yconf.instrument import ParseReport, Timing, countNodes
+from yconf.tests.test_config import YamlFileFixture, YamlConfigDirFixture
+
+
+class ParseReportTest(TestCase):
+
+    def test_measure(self):
+        report = ParseReport()
+        with report.measure("read", path="a.yml") as timing:
+            timing.info["bytes"] = 10
+        with report.measure("read", path="b.yml") as timing:
+            timing.info["bytes"] = 5
+
+        self.assertEqual(2, len(report.select("read")))
+        self.assertEqual({"path": "a.yml", "bytes": 10}, report.timings[0].info)
+        summary = report.summary()["read"]
+        self.assertEqual(2, summary["count"])
+        self.assertEqual(15, summary["bytes"])
+        self.assertTrue(summary["seconds"] >= 0)
+
+    def test_callback(self):
+        seen = []
+        report = ParseReport(seen.append)
+        report.add(Timing("merge", 0.5, environment="production"))
+        self.assertEqual(["merge"], [t.phase for t in seen])
+        self.assertEqual([{"phase": "merge", "seconds": 0.5, "environment": "production"}], report.asDicts())
+
+    def test_countNodes(self):
+        self.assertEqual(1, countNodes("a"))
+        self.assertEqual(5, countNodes({"a": 1, "b": [1, {}]}))
+
+
+class InstrumentedConfigurationTest(TestCase):
+
+    def test_disabledByDefault(self):
+        f = self.useFixture(YamlFileFixture())
+        bc = BaseConfiguration()
+        bc.parse(["-c", f.config])
+        self.assertIsNone(bc.getParseReport())
+
+    def test_phases(self):
+        f = self.useFixture(YamlFileFixture())
+        bc = BaseConfiguration(instrument=True)
+        bc.parse(["-c", f.config, "-e", "staging"])
+
+        report = bc.getParseReport()
+        self.assertEqual(["read", "yaml", "merge", "merge", "loadConfig", "arguments", "parse"],
+                         [t.phase for t in report.timings])
+        self.assertEqual(os.path.getsize(f.config), report.select("read")[0].info["bytes"])
+        self.assertTrue(report.select("yaml")[0].info["nodes"] > 1)
+        self.assertEqual(["production", "staging"], [t.info["environment"] for t in report.select("merge")])
+        self.assertTrue(report.total("parse") >= report.total("loadConfig"))
+
+    def test_callbackPerFile(self):
+        f = self.useFixture(YamlConfigDirFixture())
+        seen = []
+        bc = BaseConfiguration(instrument=seen.append)
+        bc.parse(["-c", f.dir.path])
+
+        paths = [t.info["path"] for t in seen if t.phase == "read"]
+        self.assertEqual(sorted(bc.configFiles()), sorted(paths))
+        self.assertEqual("parse", seen[-1].phase)
+
+    def test_cacheHit(self):
+        f = self.useFixture(YamlFileFixture())
+        cacheDir = self.useFixture(fixtures.TempDir()).path
+        hits = []
+        for i in range(2):
+            bc = BaseConfiguration(cacheDir=cacheDir, instrument=True)
+            bc.parse(["-c", f.config])
+            hits.append(bc.getParseReport().select("cache")[0].info["hit"])
+        self.assertEqual([False, True], hits)
+        self.assertEqual([], bc.getParseReport().select("read"))
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
@@ -0,0 +1,125 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+from testtools import TestCase, ExpectedException
+
+from yconf.config import BaseConfiguration
+from yconf.schema import Field, Schema, ValidationError
+from yconf.util import NestedDict
+from yconf.tests.test_config import YamlFileFixture
+
+
+class SchemaTest(TestCase):
+
+    def setUp(self):
+        super(SchemaTest, self).setUp()
+        self.schema = Schema({"server": {"port": Field(int, required=True, min=1, max=65535),
+                                         "host": Field(str)},
+                              "logging.level": Field(str, choices=("debug", "info")),
+                              "timeout": Field(float, min=0),
+                              "debug": Field(bool),
+                              "section": Field(dict, required=True)})
+
+    def test_valid(self):
+        config = NestedDict({"server": {"port": 80}, "logging": {"level": "info"},
+                             "timeout": 1, "section": {"a": 1}})
+
+        self.assertEqual([], self.schema.errors(config))
+        self.schema.validate(config)
+
+    def test_errors(self):
+        config = NestedDict({"server": {"port": 70000, "host": 1}, "logging": {"level": "trace"},
+                             "timeout": -1.5, "debug": 1})
+
+        self.assertEqual([("debug", "expected bool, got int"),
+                          ("logging.level", "'trace' is not one of 'debug', 'info'"),
+                          ("section", "is required"),
+                          ("server.host", "expected str, got int"),
+                          ("server.port", "70000 is greater than the maximum 65535"),
+                          ("timeout", "-1.5 is less than the minimum 0")],
+                         self.schema.errors(config))
+
+        with ExpectedException(ValidationError, "(?s).*server.port: is required"):
+            self.schema.validate(NestedDict({"server": True, "section": {}}))
+
+    def test_booleansAreNotIntegers(self):
+        schema = Schema({"port": Field(int)})
+
+        self.assertEqual([("port", "expected int, got bool")], schema.errors(NestedDict({"port": True})))
+
+    def test_invalidSchema(self):
+        with ExpectedException(TypeError, "Expected a Field or a mapping for a.b, got .*int"):
+            Schema({"a": {"b": int}})
+
+
+class SchemaConfiguration(BaseConfiguration):
+
+    settingsSchema = {"a": Field(str, required=True),
+                      "e.f": Field(str, choices=("g", "h"))}
+
+    def makeParser(self):
+        parser = super(SchemaConfiguration, self).makeParser()
+        parser.add_argument("-f", dest="e.f")
+        return parser
+
+
+class ConfigurationSchemaTest(TestCase):
+
+    def test_parse(self):
+        f = self.useFixture(YamlFileFixture())
+
+        bc = SchemaConfiguration()
+        bc.parse(args=["-c", f.config, "-f", "h"])
+        self.assertEqual("h", bc.e.f)
+        self.assertIs(SchemaConfiguration.compiledSchema(), SchemaConfiguration.compiledSchema())
+
+        with ExpectedException(ValidationError, "(?s).*e.f: 'x' is not one of 'g', 'h'"):
+            SchemaConfiguration().parse(args=["-c", f.config, "-f", "x"])
+        with ExpectedException(ValidationError, "(?s).*a: is required"):
+            SchemaConfiguration().parse(args=[])
+
+    def test_schemaSettings(self):
+        f = self.useFixture(YamlFileFixture())
+        with open(f.config, "w") as fp:
+            fp.write("production: {a: a, schema: s, validate: v}")
+
+        bc = SchemaConfiguration()
+        bc.parse(args=["-c", f.config])
+        self.assertEqual("s", bc.schema)
+        self.assertEqual("v", bc.validate)
+
+    def test_reload(self):
+        f = self.useFixture(YamlFileFixture())
+        bc = SchemaConfiguration()
+        bc.parse(args=["-c", f.config])
+
+        with ExpectedException(ValidationError):
+            bc.reload({"production": {"a": 1}})
+        self.assertEqual("a", bc.a)
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
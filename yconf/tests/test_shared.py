@@ -0,0 +1,145 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import datetime
+import os
+import subprocess
+import sys
+from unittest import skipIf, skipUnless
+
+from testtools import TestCase, ExpectedException
+
+from yconf.config import BaseConfiguration
+try:
+    from yconf.shared import SharedConfig, attach, publish
+except ImportError:
+    # multiprocessing.shared_memory requires python 3.8, test discovery imports
+    # this module anyway
+    publish = None
+from yconf.util import NestedDict
+from yconf.tests.test_config import YamlFileFixture
+
+
+@skipIf(publish is None, "requires python 3.8")
+class SharedConfigTest(TestCase):
+
+    def setUp(self):
+        super(SharedConfigTest, self).setUp()
+        self.data = {"a": {"b": {"c": "d"}, "e": [1, {"f": 2}]},
+                     1: "one",
+                     "date": datetime.date(2020, 1, 1)}
+
+    def publish(self, config):
+        segment = publish(config)
+        self.addCleanup(segment.unlink)
+        self.addCleanup(segment.close)
+        return segment
+
+    def test_access(self):
+        shared = SharedConfig(self.publish(NestedDict(self.data)).buf)
+
+        self.assertEqual("d", shared.a.b.c)
+        self.assertEqual("d", shared["a"]["b"]["c"])
+        self.assertEqual("d", getattr(shared, "a.b.c"))
+        self.assertEqual([1, {"f": 2}], shared.a.e)
+        self.assertEqual("one", shared[1])
+        self.assertEqual(datetime.date(2020, 1, 1), shared.date)
+        self.assertEqual("d", shared.lookup(("a", "b", "c")))
+        self.assertIsNone(shared.lookup(("a", "x")))
+        self.assertEqual("x", shared.get("x", "x"))
+        self.assertIn("a", shared)
+        self.assertFalse(hasattr(shared, "a.x"))
+        self.assertEqual(sorted(["b", "e"]), sorted(shared.a.keys()))
+        self.assertEqual(3, len(shared))
+
+    def test_lazyDottedKeys(self):
+        data = dict(("s%d" % i, {"k.v%d" % i: i}) for i in range(50))
+        shared = SharedConfig(self.publish(NestedDict(data, lazy=True)).buf)
+
+        for i in range(50):
+            self.assertEqual(i, shared.lookup(("s%d" % i, "k", "v%d" % i)))
+            self.assertEqual(["v%d" % i], list(getattr(shared, "s%d.k" % i).keys()))
+
+    def test_readOnly(self):
+        shared = SharedConfig(self.publish(NestedDict(self.data)).buf)
+
+        with ExpectedException(AttributeError):
+            shared.a = 1
+        with ExpectedException(TypeError):
+            shared["a"] = 1
+        with ExpectedException(TypeError):
+            shared._buf[0] = 0
+
+    def test_attach(self):
+        segment = self.publish(NestedDict(self.data))
+
+        shared = attach(segment.name)
+        self.assertEqual("d", shared.a.b.c)
+        shared.close()
+
+        code = "from yconf.shared import attach; print(attach(%r).a.b.c)" % segment.name
+        output = subprocess.check_output([sys.executable, "-c", code],
+                                         cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+        self.assertEqual(b"d", output.strip())
+
+    @skipUnless(hasattr(os, "fork"), "requires fork")
+    def test_attachForked(self):
+        # the resource tracker of the publisher reports unlinking a segment it
+        # does not know about on stderr
+        code = "\n".join([
+            "import os",
+            "from yconf.shared import attach, publish",
+            "from yconf.util import NestedDict",
+            "segment = publish(NestedDict({'a': {'b': 1}}))",
+            "pid = os.fork()",
+            "if pid == 0:",
+            "    shared = attach(segment.name)",
+            "    assert shared.a.b == 1",
+            "    shared.close()",
+            "    os._exit(0)",
+            "os.waitpid(pid, 0)",
+            "segment.close()",
+            "segment.unlink()",
+        ])
+        process = subprocess.Popen([sys.executable, "-c", code], stderr=subprocess.PIPE,
+                                   cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+        stderr = process.communicate()[1]
+        self.assertEqual(0, process.returncode)
+        self.assertEqual(b"", stderr)
+
+    def test_configuration(self):
+        f = self.useFixture(YamlFileFixture())
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config, "-e", "staging"])
+
+        shared = SharedConfig(self.publish(bc).buf)
+        self.assertEqual(("a", "B", "g"), (shared.a, shared.b, shared.e.f))
+        self.assertEqual("staging", shared.environment)
+        self.assertNotIn("parser", shared)
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
@@ -23,10 +23,14 @@
 # (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
-from testtools import TestCase
+import copy
+import pickle
+
+from testtools import TestCase, ExpectedException
 from testtools.matchers import IsInstance, KeysEqual
 
-from yconf.util import NestedDict
+from yconf.util import (NestedDict, FrozenNestedDict, Change, _toDict, contentHash, diff, freeze,
+                        patch, trace, untrace)
 
 
 class ConfigEntryTest(TestCase):
@@ -113,6 +117,28 @@ class ConfigEntryTest(TestCase):
         self.assertEqual(nd.a.g, "h")
         self.assertEqual(nd.a.e, "f")
 
+    def test_updateInPlace(self):
+
+        nd = NestedDict(self.data)
+        child = nd.a.b
+        nd.update({"a": {"b": {"i": "j"}}})
+
+        self.assertIs(child, nd.a.b)
+        self.assertEqual("j", child.i)
+        self.assertEqual("d", child.c)
+
+    def test_updateSharedValue(self):
+
+        shared = NestedDict({"b": {"c": "d"}})
+        nd = NestedDict()
+        nd.update({"a": shared})
+        nd.update({"a": {"b": {"c": "x"}, "e": "f"}})
+
+        self.assertEqual("x", nd.a.b.c)
+        self.assertEqual("f", nd.a.e)
+        self.assertEqual("d", shared.b.c)
+        self.assertFalse(shared.has("e"))
+
     def test_nested_update(self):
 
         nd = NestedDict({"a.b": "c"})
@@ -124,6 +150,23 @@ class ConfigEntryTest(TestCase):
         nd.update({"a": "d"})
         self.assertEquals(nd.a, "d")
 
+    def test_update_nonStringKeys(self):
+
+        nd = NestedDict({1: {"a": "b"}, 2.5: "c", None: "d"})
+        nd.update({1: {"e": "f"}})
+
+        self.assertEqual({"a": "b", "e": "f"}, self.nestedToDict(nd[1]))
+        self.assertEqual("c", nd[2.5])
+        self.assertEqual("d", nd[None])
+
+    def test_update_dottedAndNested(self):
+
+        nd = NestedDict({"a": {"b": {"c": "d"}}, "a.b.e": "f"})
+        nd.update({"a.b": {"g": "h"}, "a": {"b": {"c": "x"}}})
+
+        self.assertEqual({"c": "x", "e": "f", "g": "h"}, self.nestedToDict(nd.a.b))
+        self.assertIs(nd, nd.a.parent)
+
     def test_setdefault(self):
 
         nd = NestedDict()
@@ -143,6 +186,144 @@ class ConfigEntryTest(TestCase):
         self.assertEqual("d", nd.lookup(("a", "b", "c")))
         self.assertIsNone(None, nd.lookup(("a", "x", "y")))
         self.assertEqual(self.data["a"], self.nestedToDict(nd.lookup(["a"])))
+        self.assertIs(nd.a.b, nd.lookup(("a", "b")))
+        self.assertEqual("y", nd.lookup(("a", "e", "x"), "y"))
+        self.assertEqual("y", nd.lookup(("a", "b", "c", "d"), "y"))
+
+    def test_lookupMany(self):
+
+        nd = NestedDict(self.data)
+        paths = [("a", "b", "c"), ("a", "x"), ("a", "e"), ("a", "b", "c"), ("a", "e", "f"), ["a"]]
+        expected = [nd.lookup(path, "-") for path in paths]
+
+        self.assertEqual(["d", "-", "f", "d", "-", nd.a], expected)
+        self.assertEqual(expected, nd.lookupMany(paths, "-"))
+        nd.buildIndex()
+        self.assertEqual(expected, nd.lookupMany(paths, "-"))
+        self.assertEqual([], nd.lookupMany([]))
+
+    def test_index(self):
+
+        nd = NestedDict(self.data)
+        index = nd.buildIndex()
+
+        self.assertEqual("d", index["a.b.c"])
+        self.assertIs(nd.a.b, index["a.b"])
+        self.assertEqual("d", getattr(nd, "a.b.c"))
+        self.assertEqual("f", nd.lookup(("a", "e")))
+
+    def test_indexFollowsChanges(self):
+
+        nd = NestedDict(self.data)
+        nd.buildIndex()
+
+        nd.a.b.c = "x"
+        self.assertEqual("x", getattr(nd, "a.b.c"))
+        nd.update({"a": {"g": "h"}})
+        self.assertEqual("h", nd.lookup(("a", "g")))
+        del nd.a["e"]
+        self.assertFalse(hasattr(nd, "a.e"))
+        self.assertIsNone(nd.lookup(("a", "e")))
+
+    def test_indexSharedSubtree(self):
+
+        shared = NestedDict({"c": "d"})
+        nd = NestedDict(self.data)
+        nd.update({"s": shared})
+        nd.buildIndex()
+
+        shared.c = "x"
+        self.assertEqual("x", getattr(nd, "s.c"))
+        self.assertEqual("x", nd.lookup(("s", "c")))
+
+    def test_trace(self):
+
+        nd = NestedDict(self.data)
+        nd.update({"g": {"h": "i"}, "j": 1})
+        accessTrace = trace(nd)
+
+        nd.a.b.c
+        nd["a"]["e"]
+        nd.get("j")
+        nd.get("missing")
+        self.assertEqual("d", nd.lookup(("a", "b", "c")))
+        self.assertEqual([("a", 2), ("a.b.c", 2), ("a.b", 1), ("a.e", 1), ("j", 1)], accessTrace.report())
+        self.assertEqual(["g"], accessTrace.unread())
+
+        nd.update({"g": {"k": "l"}})
+        nd.g.k
+        self.assertEqual(["g.h"], accessTrace.unread())
+        self.assertIs(accessTrace, trace(nd))
+
+        untrace(nd)
+        nd.g.h
+        self.assertEqual(["g.h"], accessTrace.unread())
+
+    def test_freezeKey(self):
+
+        nd = NestedDict({"freeze": 1})
+        self.assertEqual(1, nd.freeze)
+        self.assertEqual(1, freeze(nd).freeze)
+
+    def test_traceKeys(self):
+
+        nd = NestedDict({"trace": 1, "untrace": 2})
+        trace(nd)
+        self.assertEqual(1, nd.trace)
+        self.assertEqual(2, nd.untrace)
+
+    def test_traceIndexed(self):
+
+        nd = NestedDict(self.data)
+        nd.buildIndex()
+        accessTrace = trace(nd, ignore=["a.e"])
+
+        self.assertEqual("d", getattr(nd, "a.b.c"))
+        self.assertEqual({"a.b.c": 1}, dict(accessTrace.counts))
+        self.assertEqual([], accessTrace.unread())
+
+    def test_lazy(self):
+
+        nd = NestedDict(self.data, lazy=True)
+        self.assertIs(dict, type(nd.data["a"]))
+
+        a = nd.a
+        self.assertThat(a, IsInstance(NestedDict))
+        self.assertIs(a, nd["a"])
+        self.assertIs(dict, type(a.data["b"]))
+        self.assertEqual("d", a.b.c)
+        self.assertEqual(self.data, self.nestedToDict(nd))
+
+    def test_lazyUpdate(self):
+
+        nd = NestedDict(self.data, lazy=True)
+        nd.update({"a": {"b": {"x": "y"}}, "g.h": {"i": "j"}})
+
+        self.assertEqual({"c": "d"}, self.data["a"]["b"])
+        self.assertEqual({"a": {"b": {"c": "d", "x": "y"}, "e": "f"}, "g": {"h": {"i": "j"}}},
+                         self.nestedToDict(nd))
+
+    def test_lazyDottedKeys(self):
+
+        data = {"s": {"a.b": 1, "a": {"c": 2}, "x.y.z": 3, "x": {"y": 4}}}
+        nd = NestedDict(data, lazy=True)
+        eager = NestedDict(data)
+
+        self.assertEqual({"s": {"a": {"b": 1, "c": 2}, "x": {"y": 4}}}, _toDict(nd))
+        self.assertEqual([], diff(nd, eager))
+        self.assertEqual(contentHash(eager), contentHash(nd))
+        nd.s
+        self.assertEqual([], diff(eager, nd))
+
+    def test_lazyLookup(self):
+
+        nd = NestedDict(self.data, lazy=True)
+
+        self.assertThat(nd.lookup(("a", "b")), IsInstance(NestedDict))
+        self.assertIs(nd.a.b, nd.lookup(("a", "b")))
+        self.assertThat(nd.lookupMany([("a",), ("a", "b")])[1], IsInstance(NestedDict))
+        self.assertEqual("d", nd.buildIndex()["a.b.c"])
+        self.assertEqual(freeze(NestedDict(self.data)), freeze(nd))
 
     def test_items(self):
 
@@ -248,6 +429,18 @@ class ConfigEntryTest(TestCase):
         self.assertFalse(hasattr(nd, "b"))
         self.assertFalse(hasattr(nd, "a.b.c.d"))
 
+    def test_slots(self):
+        nd = NestedDict(self.data)
+
+        self.assertFalse(hasattr(nd, "__dict__"))
+        self.assertFalse(hasattr(nd.a, "__dict__"))
+
+    def test_internKeys(self):
+        first = NestedDict({"".join(["ke", "y"]): 1})
+        second = NestedDict({"".join(["k", "ey"]): 2})
+
+        self.assertIs(list(first.keys())[0], list(second.keys())[0])
+
     def test_setitem(self):
         nd = NestedDict(self.data)
 
@@ -258,6 +451,151 @@ class ConfigEntryTest(TestCase):
         self.assertTrue(hasattr(nd, "a.b.c"))
         self.assertEqual(nd.a.b.c, 'd')
 
+class FrozenNestedDictTest(TestCase):
+
+    def setUp(self):
+        TestCase.setUp(self)
+        self.nd = NestedDict({"a": {"b": {"c": "d"}, "e": [1, {"f": "g"}]}, "h": "i"})
+
+    def test_access(self):
+        frozen = freeze(self.nd)
+
+        self.assertThat(frozen.a, IsInstance(FrozenNestedDict))
+        self.assertEqual("d", frozen.a.b.c)
+        self.assertEqual("d", getattr(frozen, "a.b.c"))
+        self.assertEqual("d", frozen["a"]["b"]["c"])
+        self.assertEqual("d", frozen.lookup(("a", "b", "c")))
+        self.assertEqual("i", frozen.get("h"))
+        self.assertIsNone(frozen.get("x"))
+        self.assertEqual((1, FrozenNestedDict({"f": "g"})), frozen.a.e)
+        self.assertEqual(["a", "h"], sorted(frozen.keys()))
+        self.assertFalse(hasattr(frozen, "a.x"))
+
+    def test_copy(self):
+        frozen = freeze(self.nd)
+
+        for copied in (copy.copy(frozen), copy.deepcopy(frozen), pickle.loads(pickle.dumps(frozen))):
+            self.assertEqual(frozen, copied)
+            self.assertEqual("d", getattr(copied, "a.b.c"))
+            self.assertIsNotNone(copied._index)
+        self.assertFalse(hasattr(FrozenNestedDict.__new__(FrozenNestedDict), "x"))
+
+    def test_lazy(self):
+        nd = NestedDict({"a": {"x.y": 1, "b": {"c.d": 2}}}, lazy=True)
+        frozen = freeze(nd)
+
+        self.assertEqual(1, frozen.a.x.y)
+        self.assertEqual(1, frozen.lookup(("a", "x", "y")))
+        self.assertEqual(2, getattr(frozen, "a.b.c.d"))
+        self.assertEqual(freeze(NestedDict(_toDict(nd))), frozen)
+
+    def test_immutable(self):
+        frozen = freeze(self.nd)
+
+        with ExpectedException(AttributeError):
+            frozen.h = "x"
+        with ExpectedException(TypeError):
+            frozen["h"] = "x"
+        with ExpectedException(TypeError):
+            del frozen["h"]
+        self.assertRaises(AttributeError, setattr, frozen, "_data", {})
+        self.assertEqual("i", frozen.h)
+
+    def test_snapshot(self):
+        frozen = freeze(self.nd)
+        self.nd.a.b.c = "x"
+
+        self.assertEqual("d", frozen.a.b.c)
+
+    def test_hashable(self):
+        first = freeze(self.nd)
+        second = freeze(NestedDict(self.nd))
+
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertEqual(1, len(set([first, second])))
+
+        self.nd.h = "x"
+        self.assertNotEqual(first, freeze(self.nd))
+
+
+class DiffTest(TestCase):
+
+    def setUp(self):
+        TestCase.setUp(self)
+        self.data = {"a": {"b": {"c": "d"}, "e": [1, 2]}, "f": {"g": 1}, "h": 2}
+
+    def test_identical(self):
+        a = NestedDict(self.data)
+
+        self.assertEqual([], diff(a, a))
+        self.assertEqual([], diff(a, NestedDict(self.data)))
+        self.assertEqual(contentHash(a), contentHash(NestedDict(self.data)))
+
+    def test_changes(self):
+        a = NestedDict(self.data)
+        b = NestedDict(self.data)
+        b.update({"a": {"b": {"c": "x"}, "e": [1, 2, 3]}, "h": {"i": 1}, "j": {"k": 1}})
+        del b["f"]
+
+        changes = sorted(diff(a, b), key=lambda c: c.path)
+        self.assertEqual([Change.CHANGE, Change.CHANGE, Change.REMOVE, Change.CHANGE, Change.ADD],
+                         [c.kind for c in changes])
+        self.assertEqual(["a.b.c", "a.e", "f", "h", "j"], [c.dotted for c in changes])
+        self.assertEqual(("d", "x"), (changes[0].old, changes[0].new))
+        self.assertEqual(None, changes[2].new)
+
+    def test_patch(self):
+        a = NestedDict(self.data)
+        b = NestedDict(self.data)
+        b.update({"a": {"b": 1, "x": {"y": "z"}}, "f": {"g": {"h": 2}}})
+        del b["h"]
+
+        patch(a, diff(a, b))
+        self.assertEqual(_toDict(b), _toDict(a))
+        self.assertEqual([], diff(a, b))
+
+    def test_patchCopies(self):
+        a = NestedDict(self.data)
+        b = NestedDict({"a": {"e": [{"x": 1}]}, "d": {"l": [1]}})
+
+        patch(a, diff(a, b))
+        self.assertEqual(_toDict(b), _toDict(a))
+        self.assertIsNot(b.a.e, a.a.e)
+        self.assertIsNot(b.a.e[0], a.a.e[0])
+        self.assertIsNot(b.d.l, a.d.l)
+        b.a.e[0]["x"] = 2
+        self.assertEqual(1, a.a.e[0]["x"])
+
+    def test_hashCollision(self):
+        # hash(-1) == hash(-2), equal content hashes have to mean equal content
+        a = NestedDict({"x": -1, "s": {"y": -1}})
+        b = NestedDict({"x": -2, "s": {"y": -2}})
+
+        self.assertNotEqual(contentHash(a), contentHash(b))
+        self.assertEqual(["s.y", "x"], sorted(c.dotted for c in diff(a, b)))
+        self.assertEqual([], diff(NestedDict({"x": 1}), NestedDict({"x": 1})))
+        self.assertEqual(["x"], [c.dotted for c in diff(NestedDict({"x": 1}), NestedDict({"x": True}))])
+
+    def test_hashFollowsChanges(self):
+        a = NestedDict(self.data)
+        before = contentHash(a)
+        self.assertIsNotNone(a.a._hash)
+
+        a.a.b.c = "x"
+        self.assertIsNone(a._hash)
+        self.assertIsNotNone(a.f._hash)
+        self.assertNotEqual(before, contentHash(a))
+
+        shared = NestedDict({"c": "d"})
+        a.update({"s": shared})
+        snapshot = NestedDict(_toDict(a))
+        self.assertEqual([], diff(snapshot, a))
+        self.assertIsNone(a._hash)
+        shared.c = "x"
+        self.assertEqual(["s.c"], [c.dotted for c in diff(snapshot, a)])
+
+
 def test_suite():
     from unittest import TestLoader
     return TestLoader().loadTestsFromName(__name__)
@@ -0,0 +1,151 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import threading
+
+import yaml
+
+from testtools import TestCase, ExpectedException
+
+from yconf.config import BaseConfiguration
+from yconf.watch import ConfigWatcher
+from yconf.tests.test_config import YamlFileFixture, YamlConfigDirFixture
+
+
+class ArgsConfiguration(BaseConfiguration):
+
+    def makeParser(self):
+        parser = super(ArgsConfiguration, self).makeParser()
+        parser.add_argument("-a", dest="a")
+        return parser
+
+
+class ReloadTest(TestCase):
+
+    def write(self, path, data):
+        with open(path, "w") as f:
+            f.write(yaml.dump(data))
+
+    def test_reload(self):
+        f = self.useFixture(YamlFileFixture())
+        bc = ArgsConfiguration()
+        bc.parse(args=["-c", f.config, "-e", "staging", "-a", "1"])
+
+        self.assertEqual(set(), bc.reload())
+
+        self.write(f.config, {"production": {"a": "a", "b": "b", "e": {"f": "x"}},
+                              "staging": {"d": "D"}})
+        self.assertEqual(set(["b", "c", "d", "e.f"]), bc.reload())
+        self.assertEqual("1", bc.a)
+        self.assertEqual("b", bc.b)
+        self.assertFalse(bc.has("c"))
+        self.assertEqual("D", bc.d)
+        self.assertEqual("x", bc.e.f)
+        self.assertEqual("staging", bc.environment)
+
+    def test_reloadCollidingValues(self):
+        f = self.useFixture(YamlFileFixture())
+        self.write(f.config, {"production": {"port": -1}})
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config])
+
+        self.write(f.config, {"production": {"port": -2}})
+        self.assertEqual(set(["port"]), bc.reload())
+        self.assertEqual(-2, bc.port)
+
+    def test_reloadBeforeParse(self):
+        with ExpectedException(RuntimeError):
+            BaseConfiguration().reload()
+
+
+class ConfigWatcherTest(TestCase):
+
+    def test_check(self):
+        f = self.useFixture(YamlConfigDirFixture())
+        bc = ArgsConfiguration()
+        bc.parse(args=["-c", f.dir.path, "-e", "staging", "-a", "1"])
+
+        calls = []
+        watcher = ConfigWatcher(bc, useInotify=False)
+        watcher.subscribe(lambda config, changed: calls.append(changed))
+        self.assertEqual(set(), watcher.check())
+
+        loaded = []
+        original = bc.loadFile
+        bc.__dict__["loadFile"] = lambda path, context=None: loaded.append(path) or original(path, context)
+
+        with open(os.path.join(f.dir.path, "staging.yml"), "w") as fp:
+            fp.write(yaml.dump({"b": "X", "c": "C"}))
+        self.assertEqual(set(["b", "c"]), watcher.check())
+        self.assertEqual([os.path.join(f.dir.path, "staging.yml")], loaded)
+        self.assertEqual([set(["b", "c"])], calls)
+        self.assertEqual("X", bc.b)
+        self.assertEqual("C", bc.c)
+        self.assertEqual("1", bc.a)
+
+        os.unlink(os.path.join(f.dir.path, "staging.yml"))
+        self.assertEqual(set(["b", "c"]), watcher.check())
+        self.assertEqual("b", bc.b)
+        self.assertEqual("c", bc.c)
+
+    def test_checkInclude(self):
+        f = self.useFixture(YamlFileFixture({"production": {"a": "a"}}))
+        fragment = os.path.join(f.dir.path, "fragment.yml")
+        with open(fragment, "w") as fp:
+            fp.write("x: 1\n")
+        with open(f.config, "w") as fp:
+            fp.write("production:\n  a: !include fragment.yml\n")
+
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config])
+        watcher = ConfigWatcher(bc, useInotify=False)
+        self.assertEqual(set(), watcher.check())
+
+        with open(fragment, "w") as fp:
+            fp.write("x: 22\n")
+        self.assertEqual(set(["a.x"]), watcher.check())
+        self.assertEqual(22, bc.a.x)
+
+    def test_thread(self):
+        f = self.useFixture(YamlFileFixture())
+        bc = BaseConfiguration()
+        bc.parse(args=["-c", f.config])
+
+        changed = threading.Event()
+        watcher = ConfigWatcher(bc, interval=0.01, useInotify=False)
+        watcher.subscribe(lambda config, paths: changed.set())
+        watcher.start()
+        self.addCleanup(watcher.stop)
+
+        with open(f.config, "w") as fp:
+            fp.write(yaml.dump({"production": {"a": "x"}}))
+        self.assertTrue(changed.wait(5))
+        self.assertEqual("x", bc.a)
+
+
+def test_suite():
+    from unittest import TestLoader
+    return TestLoader().loadTestsFromName(__name__)
@@ -24,21 +24,62 @@
 # SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 
+import copy
+import hashlib
+
+from collections import defaultdict, namedtuple
+
+try:
+    from sys import intern
+except ImportError:
+    # python 2 has intern as a builtin
+    pass
+
+
 class NestedDict(object):
 
-    def __init__(self, dict={}):
+    __slots__ = ("parent", "data", "_owner", "_index", "_indexed", "_trace", "_lazy", "_hash")
+
+    def __init__(self, dict={}, lazy=False):
         object.__setattr__(self, "parent", None)
         object.__setattr__(self, "data", {})
+        # set on children created by update, which may therefore be merged into in place
+        object.__setattr__(self, "_owner", None)
+        # flat index of dotted paths, see buildIndex
+        object.__setattr__(self, "_index", None)
+        object.__setattr__(self, "_indexed", False)
+        # (AccessTrace, dotted prefix of this node) while access is traced
+        object.__setattr__(self, "_trace", None)
+        # keep nested dicts as they are until they are accessed, see _wrap
+        object.__setattr__(self, "_lazy", lazy)
+        # content digest, see contentHash
+        object.__setattr__(self, "_hash", None)
         self.update(dict)
 
     def __getitem__(self, key):
         rv = self.data[key]
+        if type(rv) is dict:
+            rv = self._wrap(key, rv)
+        if self._trace is not None:
+            self._trace[0].hit(self._trace[1], key)
         if type(rv) is type(self) and not rv.parent:
             object.__setattr__(rv, "parent", self)
             return rv
         return rv
 
     def __getattr__(self, key):
+        if "." in key:
+            index = self._getIndex()
+            if index is not None:
+                try:
+                    value = index[key]
+                except KeyError:
+                    pass
+                else:
+                    if self._trace is not None:
+                        self._trace[0].hit(self._trace[1], key)
+                    return value
+
         keys = key.split(".")
         try:
             r = self[keys[0]]
@@ -73,38 +114,183 @@ class NestedDict(object):
         return key in self.data
 
     def __call__(self):
+        if self._lazy:
+            self._wrapAll()
         return self.data
 
     def update(self, other):
+        self._touch()
+        self._merge(other)
+        if self._trace is not None:
+            _setTrace(self, self._trace)
+
+    def _merge(self, other):
+        if self._index is not None:
+            object.__setattr__(self, "_index", None)
+        if self._hash is not None:
+            object.__setattr__(self, "_hash", None)
+        data = self.data
         for (key, value) in other.items():
-            value = NestedDict(value) if type(value) is dict else value
-
-            if '.' in key:
-                key, remainder = key.split('.', 1)
-                value = NestedDict({remainder: value})
-            if key in self.data and \
-                type(self[key]) in (dict, NestedDict) and \
-                    type(value) in (dict, NestedDict):
-                self.data[key] = NestedDict(self[key])
-                object.__setattr__(self.data[key], "parent", self)
-                self.data[key].update(value)
+            if type(key) is str:
+                if '.' in key:
+                    key, remainder = key.split('.', 1)
+                    value = {remainder: value}
+                # large trees tend to repeat the same keys over and over
+                key = intern(key)
+
+            kind = type(value)
+            if kind is not dict and kind is not NestedDict:
+                data[key] = value
+                continue
+
+            current = data.get(key)
+            currentKind = type(current)
+            if currentKind is dict or currentKind is NestedDict:
+                # merge into children we created ourselves, copy anything shared once
+                if currentKind is dict or current._owner is not self:
+                    current = data[key] = self._child(current)
+                current._merge(value)
+            elif kind is dict and not self._lazy:
+                data[key] = self._child(value)
             else:
-                self.data[key] = value
+                # lazy trees keep plain dicts, which are never merged into but copied by _child
+                data[key] = value
+
+    def _child(self, mapping):
+        # same as NestedDict(mapping) owned by self, without the overhead of update
+        child = NestedDict.__new__(NestedDict)
+        object.__setattr__(child, "parent", self)
+        object.__setattr__(child, "data", {})
+        object.__setattr__(child, "_owner", self)
+        object.__setattr__(child, "_index", None)
+        object.__setattr__(child, "_indexed", False)
+        object.__setattr__(child, "_trace", None)
+        object.__setattr__(child, "_lazy", self._lazy)
+        object.__setattr__(child, "_hash", None)
+        child._merge(mapping)
+        return child
+
+    def _wrap(self, key, mapping):
+        # turn a plain dict left by a lazy update into a child on first access
+        child = self.data[key] = self._child(mapping)
+        if self._trace is not None:
+            _setTrace(child, (self._trace[0], "%s%s." % (self._trace[1], key)))
+        return child
+
+    def _wrapAll(self):
+        for key, value in self.data.items():
+            if type(value) is dict:
+                self._wrap(key, value)
+
+    def _adopt(self, child):
+        object.__setattr__(child, "parent", self)
+        object.__setattr__(child, "_owner", self)
+        return child
+
+    def _touch(self):
+        # drop the indexes and content hashes of this node and every node owning it
+        node = self
+        while node is not None:
+            if node._index is not None:
+                object.__setattr__(node, "_index", None)
+            if node._hash is not None:
+                object.__setattr__(node, "_hash", None)
+            node = node._owner
+
+    def buildIndex(self):
+        """
+        Build a flat index mapping dotted paths to values, so that dotted attribute
+        access and lookup resolve with a single dict lookup. Once built, the index
+        is dropped on every change to the tree and rebuilt on the next access.
+        """
+        index = {}
+
+        def walk(node, prefix):
+            for key, value in node.items():
+                if type(key) is not str:
+                    continue
+                index[prefix + key] = value
+                # shared subtrees can change behind our back, they are not indexed
+                if type(value) is NestedDict and value._owner is node:
+                    walk(value, prefix + key + ".")
+
+        walk(self, "")
+        object.__setattr__(self, "_index", index)
+        object.__setattr__(self, "_indexed", True)
+        return index
+
+    def _getIndex(self):
+        if self._index is None and self._indexed:
+            return self.buildIndex()
+        return self._index
 
     def lookup(self, path, default=None):
-        b = self.data.copy()
-        for i in path[:-1]:
-            b = b.get(i, {})
-        return b.get(path[-1], default)
+        index = self._getIndex()
+        if index is not None:
+            try:
+                value = index[".".join(path)]
+            except (KeyError, TypeError):
+                pass
+            else:
+                if self._trace is not None:
+                    self._trace[0].hit(self._trace[1], ".".join(path))
+                return value
+
+        value = self
+        for key in path:
+            data = _children(value)
+            if data is None or key not in data:
+                return default
+            child = data[key]
+            if type(child) is dict and data is not value:
+                child = value._wrap(key, child)
+            value = child
+        if self._trace is not None:
+            self._trace[0].hit(self._trace[1], ".".join(map(str, path)))
+        return value
+
+    def lookupMany(self, paths, default=None):
+        """
+        Look up a sequence of paths and return their values in the same order.
+        Paths sharing a prefix walk that prefix only once.
+        """
+        paths = list(paths)
+        return self._lookupTrie(paths, _pathTrie(paths), default)
+
+    def _lookupTrie(self, paths, trie, default):
+        # trie as built by _pathTrie(paths), which callers looking up the same paths
+        # over and over can keep
+        if self._getIndex() is not None or self._trace is not None:
+            return [self.lookup(path, default) for path in paths]
+
+        result = [default] * len(paths)
+        stack = [(self, trie)]
+        while stack:
+            value, (children, ends) = stack.pop()
+            for i in ends:
+                result[i] = value
+            data = _children(value) if children else None
+            if data is None:
+                continue
+            for key, entry in children.items():
+                if key in data:
+                    child = data[key]
+                    if type(child) is dict and data is not value:
+                        child = value._wrap(key, child)
+                    stack.append((child, entry))
+        return result
 
     def __iter__(self):
         return self.data.__iter__()
 
     def items(self):
+        if self._lazy:
+            self._wrapAll()
         return self.data.items()
 
     def delete(self, key):
         del self.data[key]
+        self._touch()
 
     def __delitem__(self, key):
         self.delete(key)
@@ -122,6 +308,8 @@ class NestedDict(object):
         return self.data.keys()
 
     def values(self):
+        if self._lazy:
+            self._wrapAll()
         return self.data.values()
 
     def has_key(self, key):
@@ -131,4 +319,397 @@ class NestedDict(object):
         return self.has(key)
 
 
-__all__ = ["NestedDict"]
+class AccessTrace(object):
+    """
+    Read counts per dotted path of a traced NestedDict, see trace.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.counts = defaultdict(int)
+        # top level keys left out of unread, e.g. options that are not configuration
+        self.ignore = set()
+
+    def hit(self, prefix, key):
+        self.counts[prefix + str(key)] += 1
+
+    def reset(self):
+        self.counts.clear()
+
+    def report(self):
+        """
+        Return a list of (path, count) tuples, most frequently read paths first.
+        """
+        return sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))
+
+    def unread(self):
+        """
+        Return the sorted dotted paths present in the tree that were never read.
+        A subtree none of which was read is reported by its own path only.
+        """
+        read = set()
+        for path in self.counts:
+            parts = path.split(".")
+            for i in range(1, len(parts) + 1):
+                read.add(".".join(parts[:i]))
+
+        result = []
+
+        def walk(node, prefix):
+            for key, value in _splitChildren(node).items():
+                path = "%s%s" % (prefix, key)
+                if path in self.ignore:
+                    continue
+                if path not in read:
+                    result.append(path)
+                elif _children(value) is not None:
+                    walk(value, path + ".")
+
+        walk(self.root, "")
+        return sorted(result)
+
+
+class FrozenNestedDict(object):
+    """
+    Read-only counterpart of NestedDict, as returned by freeze.
+
+    Nested mappings are frozen recursively, lists and sets become tuples and
+    frozensets. Reads have no side effects, so a snapshot can be shared between
+    threads freely.
+    """
+
+    __slots__ = ("_data", "_hash", "_index")
+
+    def __init__(self, dict={}):
+        object.__setattr__(self, "_data", {k: _freeze(v) for k, v in _splitChildren(dict).items()})
+        object.__setattr__(self, "_hash", None)
+        object.__setattr__(self, "_index", None)
+
+    def _buildIndex(self):
+        # a snapshot never changes, so the index of dotted paths never goes stale
+        index = {}
+
+        def walk(node, prefix):
+            for key, value in node._data.items():
+                if type(key) is not str:
+                    continue
+                index[prefix + key] = value
+                if type(value) is FrozenNestedDict:
+                    walk(value, prefix + key + ".")
+
+        walk(self, "")
+        object.__setattr__(self, "_index", index)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __getattr__(self, key):
+        if key in FrozenNestedDict.__slots__:
+            # not set yet, e.g. while copy or pickle create an instance
+            raise AttributeError(key)
+        if self._index is not None:
+            try:
+                return self._index[key]
+            except KeyError:
+                raise AttributeError(key)
+        value = self
+        for k in key.split("."):
+            if type(value) is not FrozenNestedDict or k not in value._data:
+                raise AttributeError(key)
+            value = value._data[k]
+        return value
+
+    def __setattr__(self, key, value):
+        raise AttributeError("FrozenNestedDict is immutable")
+
+    def __delattr__(self, key):
+        raise AttributeError("FrozenNestedDict is immutable")
+
+    def __setitem__(self, key, value):
+        raise TypeError("FrozenNestedDict is immutable")
+
+    def __delitem__(self, key):
+        raise TypeError("FrozenNestedDict is immutable")
+
+    def get(self, key, default=None):
+        return self._data.get(key, default)
+
+    def has(self, key):
+        return key in self._data
+
+    def lookup(self, path, default=None):
+        value = self
+        for key in path:
+            if type(value) is not FrozenNestedDict or key not in value._data:
+                return default
+            value = value._data[key]
+        return value
+
+    def __iter__(self):
+        return self._data.__iter__()
+
+    def items(self):
+        return self._data.items()
+
+    def keys(self):
+        return self._data.keys()
+
+    def values(self):
+        return self._data.values()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __eq__(self, other):
+        if type(other) is not FrozenNestedDict:
+            return NotImplemented
+        return self._data == other._data
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __reduce__(self):
+        return (_unpickleFrozen, (self._data, self._index is not None))
+
+    def __hash__(self):
+        if self._hash is None:
+            object.__setattr__(self, "_hash", hash(frozenset(self._data.items())))
+        return self._hash
+
+    def __repr__(self):
+        return "<FrozenNestedDict (%s)>" % repr(self._data)
+
+
+def freeze(tree):
+    """
+    Return an immutable, hashable snapshot of the NestedDict tree.
+    """
+    frozen = FrozenNestedDict(tree.data)
+    frozen._buildIndex()
+    return frozen
+
+
+def _unpickleFrozen(data, indexed):
+    frozen = FrozenNestedDict(data)
+    if indexed:
+        frozen._buildIndex()
+    return frozen
+
+
+def _freeze(value):
+    if type(value) in (dict, NestedDict):
+        return FrozenNestedDict(value)
+    if type(value) in (list, tuple):
+        return tuple(_freeze(v) for v in value)
+    if type(value) is set:
+        return frozenset(value)
+    return value
+
+
+def trace(tree, ignore=()):
+    """
+    Start counting reads of the NestedDict tree through item and attribute
+    access, get and lookup per dotted path and return the AccessTrace holding
+    the counts. Calling trace again returns the running AccessTrace.
+
+    Like the index, shared subtrees are not traced below their own path. This
+    is a function rather than a method so that it never hides a key named trace.
+    """
+    if tree._trace is None:
+        _setTrace(tree, (AccessTrace(tree), ""))
+    accessTrace = tree._trace[0]
+    accessTrace.ignore.update(ignore)
+    return accessTrace
+
+
+def untrace(tree):
+    """
+    Stop counting reads of tree. The counts of the AccessTrace are kept.
+    """
+    if tree._trace is not None:
+        _setTrace(tree, None)
+
+
+def _setTrace(node, trace):
+    object.__setattr__(node, "_trace", trace)
+    for key, value in node.data.items():
+        if type(value) is NestedDict and value._owner is node:
+            _setTrace(value, None if trace is None else (trace[0], "%s%s." % (trace[1], key)))
+
+
+def _pathTrie(paths):
+    # a trie of (children, indices of paths ending here) entries
+    trie = ({}, [])
+    for i, path in enumerate(paths):
+        entry = trie
+        for key in path:
+            entry = entry[0].setdefault(key, ({}, []))
+        entry[1].append(i)
+    return trie
+
+
+def _children(value):
+    if isinstance(value, NestedDict):
+        return value.data
+    if type(value) is dict:
+        return value
+    return None
+
+
+def _splitChildren(value):
+    # like _children, but plain dicts left by a lazy update get their dotted keys
+    # split the way update splits them, so that walking a tree gives the same
+    # keys whether or not its nodes were accessed yet
+    data = _children(value)
+    if type(value) is dict:
+        for key in data:
+            if type(key) is str and "." in key:
+                return _splitKeys(data)
+    return data
+
+
+def _splitKeys(mapping):
+    result = {}
+    for key, value in mapping.items():
+        if type(key) is str and "." in key:
+            key, remainder = key.split(".", 1)
+            value = {remainder: value}
+        current = result.get(key)
+        if _children(current) is not None and _children(value) is not None:
+            value = _mergePlain(current, value)
+        result[key] = value
+    return result
+
+
+def _mergePlain(a, b):
+    # dotted keys left in the result are split when the result is walked
+    merged = dict(_children(a))
+    for key, value in _children(b).items():
+        if _children(merged.get(key)) is not None and _children(value) is not None:
+            value = _mergePlain(merged[key], value)
+        merged[key] = value
+    return merged
+
+
+def _toDict(value):
+    """
+    Recursively convert NestedDict instances in value to plain dicts.
+    """
+    data = _splitChildren(value)
+    if data is not None:
+        return dict((k, _toDict(v)) for k, v in data.items())
+    return value
+
+
+def contentHash(tree):
+    """
+    Return a sha256 hex digest of the keys and values of tree. Values are told
+    apart by their type and repr, so equal digests mean equal trees. Digests are
+    cached per node until the node or one of its children changes; like the
+    index, nodes containing shared subtrees are hashed again every time.
+    """
+    return _contentHash(tree)[0]
+
+
+def _contentHash(value):
+    # returns the digest of a mapping and whether it may be cached, which it may
+    # not if a shared subtree, which can change behind our back, is part of it
+    node = value if isinstance(value, NestedDict) else None
+    if node is not None and node._hash is not None:
+        return node._hash, True
+
+    cacheable = True
+    items = []
+    for key, child in _splitChildren(value).items():
+        # repr escapes newlines and nul bytes, so they safely separate the fields
+        if _children(child) is None:
+            items.append("%r\0%s\0%r" % (key, type(child).__name__, child))
+            continue
+        h, c = _contentHash(child)
+        items.append("%r\0{\0%s" % (key, h))
+        if not c or (node is not None and isinstance(child, NestedDict) and child._owner is not node):
+            cacheable = False
+    # sorted, as equal trees may have been merged in a different order
+    h = hashlib.sha256("\n".join(sorted(items)).encode("utf-8")).hexdigest()
+    if node is not None and cacheable:
+        object.__setattr__(node, "_hash", h)
+    return h, cacheable
+
+
+class Change(namedtuple("Change", ("kind", "path", "old", "new"))):
+    """
+    A difference between two trees as returned by diff. path is the tuple of
+    keys leading to the value, old and new are None for additions and removals.
+    """
+
+    __slots__ = ()
+
+    ADD = "add"
+    REMOVE = "remove"
+    CHANGE = "change"
+
+    @property
+    def dotted(self):
+        return ".".join(str(key) for key in self.path)
+
+
+def diff(a, b):
+    """
+    Return the list of Changes turning the tree a into the tree b.
+
+    Subtrees added or removed as a whole are reported once. Subtrees that are
+    the same object or have the same content hash, see contentHash, are not
+    compared any further.
+    """
+    changes = []
+
+    def compare(a, b, prefix):
+        for key, x in a.items():
+            path = prefix + (key,)
+            if key not in b:
+                changes.append(Change(Change.REMOVE, path, x, None))
+                continue
+            y = b[key]
+            if x is y:
+                continue
+            children = _splitChildren(x), _splitChildren(y)
+            if children[0] is not None and children[1] is not None:
+                if _contentHash(x)[0] != _contentHash(y)[0]:
+                    compare(children[0], children[1], path)
+            elif type(x) is not type(y) or x != y:
+                changes.append(Change(Change.CHANGE, path, x, y))
+        for key, y in b.items():
+            if key not in a:
+                changes.append(Change(Change.ADD, prefix + (key,), None, y))
+
+    if a is not b and _contentHash(a)[0] != _contentHash(b)[0]:
+        compare(_splitChildren(a), _splitChildren(b), ())
+    return changes
+
+
+def patch(tree, changes):
+    """
+    Apply the changes returned by diff to the NestedDict tree, so that diff(a, b)
+    applied to a makes it equal to b. Additions and changes are merged with a
+    single update of copies of the new values, so a and b share nothing.
+    """
+    updates = {}
+    for change in changes:
+        if change.kind == Change.REMOVE:
+            parent = tree.lookup(change.path[:-1])
+            if isinstance(parent, NestedDict) and change.path[-1] in parent:
+                parent.delete(change.path[-1])
+            continue
+        target = updates
+        for key in change.path[:-1]:
+            target = target.setdefault(key, {})
+        # changes replace a mapping with a value or the other way round, nothing is merged
+        target[change.path[-1]] = copy.deepcopy(_toDict(change.new))
+    tree.update(updates)
+
+
+__all__ = ["NestedDict", "FrozenNestedDict", "AccessTrace", "Change", "contentHash", "diff", "freeze", "patch", "trace", "untrace"]
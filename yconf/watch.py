@@ -0,0 +1,167 @@
+# Copyright (c) 2012, Christian Kampka
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions are met:
+#     * Redistributions of source code must retain the above copyright
+#       notice, this list of conditions and the following disclaimer.
+#     * Redistributions in binary form must reproduce the above copyright
+#       notice, this list of conditions and the following disclaimer in the
+#       documentation and/or other materials provided with the distribution.
+#     * Neither the name of the <organization> nor the
+#       names of its contributors may be used to endorse or promote products
+#       derived from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS "AS IS" AND
+# ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT LIMITED TO, THE IMPLIED
+# WARRANTIES OF MERCHANTABILITY AND FITNESS FOR A PARTICULAR PURPOSE ARE
+# DISCLAIMED. IN NO EVENT SHALL <COPYRIGHT HOLDER> BE LIABLE FOR ANY
+# DIRECT, INDIRECT, INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES
+# (INCLUDING, BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND
+# ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+# (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE OF THIS
+# SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+
+import os
+import threading
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+
+class ConfigWatcher(object):
+    """
+    Watches the files of a parsed BaseConfiguration and reloads it when they change.
+
+    Only files that changed since the last check, or include a file that changed,
+    are parsed again, the settings of the others are kept in memory. Subscribers
+    are called with the configuration and the set of dotted paths that changed.
+
+    Changes are picked up with inotify if the inotify_simple package is installed
+    and by polling the files every `interval` seconds otherwise.
+    """
+
+    def __init__(self, config, interval=1.0, useInotify=True):
+        self.config = config
+        self.interval = interval
+        self.subscribers = []
+        # called with the exception when a reload in the watcher thread fails
+        self.onError = None
+
+        self._files = {}
+        self._thread = None
+        self._stopped = threading.Event()
+        self._inotify = None
+        if useInotify and inotify_simple is not None:
+            self._inotify = inotify_simple.INotify()
+
+        # the first check records the current state of the files
+        self._load(self._stat(self.config.configFiles()))
+
+    def subscribe(self, callback):
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        self.subscribers.remove(callback)
+
+    def _stat(self, paths):
+        result = {}
+        for path in paths:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            result[path] = (st.st_mtime, st.st_size)
+        return result
+
+    def _isCurrent(self, path, stat):
+        # unchanged, including every file it includes
+        entry = self._files.get(path)
+        return entry is not None and entry[0] == stat and self._stat(entry[2]) == entry[2]
+
+    def _load(self, stats):
+        files = {}
+        for path, stat in stats.items():
+            if self._isCurrent(path, stat):
+                files[path] = self._files[path]
+            else:
+                context = self.config._includeContext()
+                settings = self.config.loadFile(path, context)
+                files[path] = (stat, settings, self._stat(context.dependencies))
+        self._files = files
+
+        if self._inotify is not None:
+            flags = inotify_simple.flags
+            paths = set(files)
+            for stat, settings, dependencies in files.values():
+                paths.update(dependencies)
+            for path in paths:
+                # watch directories, editors tend to replace files instead of writing to them
+                directory = path if os.path.isdir(path) else os.path.dirname(path)
+                self._inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO |
+                                        flags.CREATE | flags.DELETE)
+
+    def check(self):
+        """
+        Reload the configuration if any of its files changed.
+
+        Returns the set of dotted paths that changed.
+        """
+        stats = self._stat(self.config.configFiles())
+        if set(stats) == set(self._files) and \
+                all(self._isCurrent(path, stat) for path, stat in stats.items()):
+            return set()
+
+        self._load(stats)
+        d = {}
+        for stat, settings, dependencies in self._files.values():
+            d.update(settings)
+
+        changed = self.config.reload(d)
+        if changed:
+            for callback in list(self.subscribers):
+                callback(self.config, changed)
+        return changed
+
+    def _wait(self):
+        if self._inotify is not None:
+            # any event is merely a hint to check, the stats tell what changed
+            self._inotify.read(timeout=int(self.interval * 1000))
+        else:
+            self._stopped.wait(self.interval)
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wait()
+            if self._stopped.is_set():
+                break
+            try:
+                self.check()
+            except Exception as e:
+                # e.g. a file that is only half written, keep the current configuration
+                if self.onError is not None:
+                    self.onError(e)
+
+    def start(self):
+        """
+        Start watching in a daemon thread.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="yconf-watcher")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+
+__all__ = ["ConfigWatcher"]